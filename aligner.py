@@ -0,0 +1,171 @@
+# Alignment ops, in the order they happen along the text.
+MATCH = "="
+SUBSTITUTION = "s"    # typed the wrong character
+INSERTION = "i"       # typed an extra character
+OMISSION = "o"        # skipped a character of the target
+
+_FAR = 1 << 30
+
+
+class BandedAligner:
+    """Incremental edit-distance alignment of typed input against a target.
+
+    Row i of the DP table holds the cost of aligning the first i typed
+    characters with each target prefix, but only within `band` cells of the
+    previous row's best end point. Typing a character computes one new row
+    (O(band)); backspace drops the last row. The best alignment ends wherever
+    the newest row is cheapest, since the rest of the target isn't typed yet.
+
+    Each cell also carries the insertions and omissions on its path (the
+    substitutions are the rest of its cost), so counts() and accuracy() are
+    O(1). ops() only traces back until it meets the previous traceback.
+    """
+
+    def __init__(self, target, band=8):
+        self.target = target
+        self.band = band
+        self.typed = []
+        hi = min(len(target), band)
+        # (lo, costs, moves, ins, omits, best): costs[k] is the cost of ending
+        # at target index lo + k, moves[k] the op that got there, ins[k] and
+        # omits[k] the insertions and omissions on that path, best the
+        # cheapest k.
+        self._rows = [(0, list(range(hi + 1)), [""] + [OMISSION] * hi, [0] * (hi + 1), list(range(hi + 1)), 0)]
+        # The last traceback: its ops, the (typed, target) cell reached after
+        # each of them (_path[0] is the start), and each cell's index.
+        self._ops = []
+        self._path = [(0, 0)]
+        self._on_path = {(0, 0): 0}
+        self._fresh = True          # _ops matches the current rows
+        self._dirty_from = _FAR     # first row replaced since the last traceback
+        self._counts = None
+
+    def push(self, ch):
+        prev_lo, prev_costs, _, prev_ins, prev_omits, prev_best = self._rows[-1]
+        prev_hi = prev_lo + len(prev_costs) - 1
+        center = prev_lo + prev_best + 1
+        lo = max(0, min(center, len(self.target)) - self.band)
+        hi = min(len(self.target), center + self.band)
+        target = self.target
+
+        costs = []
+        moves = []
+        ins = []
+        omits = []
+        for j in range(lo, hi + 1):
+            cost = _FAR
+            move = ""
+            n_ins = n_omit = 0
+            if prev_lo < j <= prev_hi + 1:
+                k = j - 1 - prev_lo
+                same = target[j - 1] == ch
+                cost = prev_costs[k] + (0 if same else 1)
+                move = MATCH if same else SUBSTITUTION
+                n_ins, n_omit = prev_ins[k], prev_omits[k]
+            if prev_lo <= j <= prev_hi and prev_costs[j - prev_lo] + 1 < cost:
+                k = j - prev_lo
+                cost = prev_costs[k] + 1
+                move = INSERTION
+                n_ins, n_omit = prev_ins[k] + 1, prev_omits[k]
+            if costs and costs[-1] + 1 < cost:
+                cost = costs[-1] + 1
+                move = OMISSION
+                n_ins, n_omit = ins[-1], omits[-1] + 1
+            costs.append(cost)
+            moves.append(move)
+            ins.append(n_ins)
+            omits.append(n_omit)
+
+        # Cheapest end; on ties prefer ending on a match, then further along.
+        best = min(range(len(costs)), key=lambda k: (costs[k], moves[k] != MATCH, -k))
+        self.typed.append(ch)
+        self._rows.append((lo, costs, moves, ins, omits, best))
+        self._dirty_from = min(self._dirty_from, len(self.typed))
+        self._fresh = False
+        self._counts = None
+
+    def pop(self):
+        if self.typed:
+            self.typed.pop()
+            self._rows.pop()
+            self._dirty_from = min(self._dirty_from, len(self.typed) + 1)
+            self._fresh = False
+            self._counts = None
+
+    @property
+    def position(self):
+        """Index in the target just past the aligned input (where the cursor goes)."""
+        lo, _, _, _, _, best = self._rows[-1]
+        return lo + best
+
+    @property
+    def cost(self):
+        _, costs, _, _, _, best = self._rows[-1]
+        return costs[best]
+
+    def ops(self):
+        """The alignment as (op, target_index, typed_char) tuples.
+
+        target_index is None for insertions and typed_char is None for
+        omissions. The list is reused between calls; don't modify it.
+        """
+        if self._fresh:
+            return self._ops
+        ops, path, on_path = self._ops, self._path, self._on_path
+        # Cells from rows that were popped or replaced no longer mean the same.
+        while path[-1][0] >= self._dirty_from:
+            del on_path[path.pop()]
+            ops.pop()
+
+        # Walk back until the new alignment joins the old one; everything
+        # before that point is unchanged.
+        tail = []
+        cells = []
+        i = len(self.typed)
+        j = self.position
+        while (i, j) not in on_path:
+            cells.append((i, j))
+            lo, _, moves, _, _, _ = self._rows[i]
+            move = moves[j - lo]
+            if move == INSERTION:
+                i -= 1
+                tail.append((move, None, self.typed[i]))
+            elif move == OMISSION:
+                j -= 1
+                tail.append((move, j, None))
+            else:
+                i -= 1
+                j -= 1
+                tail.append((move, j, self.typed[i]))
+
+        keep = on_path[(i, j)]
+        for cell in path[keep + 1:]:
+            del on_path[cell]
+        del path[keep + 1:]
+        del ops[keep:]
+        for cell in reversed(cells):
+            on_path[cell] = len(path)
+            path.append(cell)
+        tail.reverse()
+        ops.extend(tail)
+        self._fresh = True
+        self._dirty_from = _FAR
+        return ops
+
+    def counts(self):
+        if self._counts is None:
+            _, costs, _, ins, omits, best = self._rows[-1]
+            n_ins, n_omit = ins[best], omits[best]
+            n_sub = costs[best] - n_ins - n_omit
+            self._counts = {
+                MATCH: len(self.typed) - n_sub - n_ins,
+                SUBSTITUTION: n_sub, INSERTION: n_ins, OMISSION: n_omit,
+            }
+        return self._counts
+
+    def accuracy(self):
+        counts = self.counts()
+        total = sum(counts.values())
+        if total == 0:
+            return 100.0
+        return counts[MATCH] / total * 100
@@ -0,0 +1,82 @@
+import queue
+import threading
+from content_generator import ContentGenerator
+
+
+class ContentService:
+    """Long-lived source of target texts with background prefetch.
+
+    Has the same get_snippet / get_timed_content interface as ContentGenerator.
+    `prefetch()` queues generation of a mode's next text on a worker thread,
+    so it's ready by the time the next test starts. A text that hasn't been
+    prefetched is generated on the spot, as before. The worker thread is only
+    started by the first prefetch.
+    """
+
+    def __init__(self, generator=None):
+        self.generator = generator or ContentGenerator()
+        self._ready = {}        # (mode, timed) -> text
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def get_snippet(self, mode):
+        return self._take((mode, False))
+
+    def get_timed_content(self, mode):
+        return self._take((mode, True))
+
+    def prefetch(self, mode, timed):
+        key = (mode, timed)
+        with self._cond:
+            if key in self._ready or key in self._pending:
+                return
+            self._pending.add(key)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, daemon=True)
+                self._worker.start()
+        self._queue.put(key)
+
+    def prefetch_all(self, modes):
+        for mode in modes:
+            self.prefetch(mode, False)
+            self.prefetch(mode, True)
+
+    def close(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join(timeout=2)
+            self._worker = None
+
+    def _take(self, key):
+        with self._cond:
+            # Already being generated: waiting beats generating it twice.
+            while key in self._pending:
+                self._cond.wait()
+            text = self._ready.pop(key, None)
+        if text is None:
+            text = self._generate(key)
+        return text
+
+    def _generate(self, key):
+        mode, timed = key
+        if timed:
+            return self.generator.get_timed_content(mode)
+        return self.generator.get_snippet(mode)
+
+    def _work(self):
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            try:
+                text = self._generate(key)
+            except Exception:
+                # _take will generate it again and raise where it can be seen
+                text = None
+            with self._cond:
+                self._pending.discard(key)
+                if text is not None:
+                    self._ready[key] = text
+                self._cond.notify_all()
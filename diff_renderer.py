@@ -0,0 +1,141 @@
+import time
+from rich.console import COLOR_SYSTEMS
+from rich.segment import Segment
+from text_layout import split_clusters
+
+# Unchanged cells shorter than this between two edits are rewritten rather
+# than skipped, since a cursor move costs about as many bytes.
+MERGE_GAP = 6
+
+
+class DiffRenderer:
+    """Drop-in for rich's Live(screen=True) that only repaints changed cells.
+
+    Renderables are rendered exactly as Live would render them, then kept as a
+    grid of (grapheme, style) cells. Each paint compares the new grid against the
+    previous one and writes cursor moves plus restyled text for the cells that
+    differ. A change of terminal size forces a full redraw.
+    """
+
+    def __init__(self, renderable, console, refresh_per_second=20):
+        self.console = console
+        self.renderable = renderable
+        self.min_interval = 1 / refresh_per_second
+        self.frame_bytes = 0
+        self._cells = None
+        self._size = None
+        self._last_paint = 0.0
+
+    def __enter__(self):
+        self.console.set_alt_screen(True)
+        self.console.show_cursor(False)
+        self.refresh()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.console.show_cursor(True)
+        self.console.set_alt_screen(False)
+
+    def update(self, renderable, *, refresh=False):
+        self.renderable = renderable
+        if refresh or time.time() - self._last_paint >= self.min_interval:
+            self.refresh()
+
+    def refresh(self):
+        size = self.console.size
+        cells = self._render_cells(size.width, size.height)
+        if self._cells is None or size != self._size:
+            data = self._full_redraw(cells)
+        else:
+            data = self._diff(self._cells, cells)
+        self._cells = cells
+        self._size = size
+        self._last_paint = time.time()
+        self.frame_bytes = len(data.encode("utf-8"))
+        if data:
+            self.console.file.write(data)
+            self.console.file.flush()
+
+    def _render_cells(self, width, height):
+        options = self.console.options.update(width=width, height=height)
+        lines = self.console.render_lines(self.renderable, options, pad=True)
+        lines = Segment.set_shape(lines, width, height)
+        grid = []
+        for line in lines:
+            row = []
+            for segment in line:
+                if segment.control:
+                    continue
+                text = segment.text
+                if text.isascii():
+                    row.extend((ch, segment.style) for ch in text)
+                    continue
+                for start, end, cells in split_clusters(text):
+                    cluster = text[start:end]
+                    if cells == 0:
+                        # Zero-width (a stray combining mark): rides along
+                        # with the cell before it.
+                        if row:
+                            row[-1] = (row[-1][0] + cluster, row[-1][1])
+                        continue
+                    row.append((cluster, segment.style))
+                    # Wide clusters take two cells; the second is a blank
+                    # placeholder so columns stay aligned with the terminal.
+                    row.extend(("", segment.style) for _ in range(cells - 1))
+            grid.append(row[:width])
+        return grid
+
+    def _full_redraw(self, cells):
+        out = ["\x1b[2J"]
+        for y, row in enumerate(cells):
+            out.append(f"\x1b[{y + 1};1H")
+            out.append(self._paint_run(row, 0, len(row)))
+        return "".join(out)
+
+    def _diff(self, old, new):
+        out = []
+        for y, (old_row, new_row) in enumerate(zip(old, new)):
+            if old_row == new_row:
+                continue
+            for start, end in _changed_runs(old_row, new_row):
+                out.append(f"\x1b[{y + 1};{start + 1}H")
+                out.append(self._paint_run(new_row, start, end))
+        return "".join(out)
+
+    def _paint_run(self, row, start, end):
+        color_system = COLOR_SYSTEMS.get(self.console.color_system)
+        out = []
+        i = start
+        while i < end:
+            style = row[i][1]
+            j = i
+            while j < end and row[j][1] == style:
+                j += 1
+            text = "".join(ch for ch, _ in row[i:j])
+            out.append(style.render(text, color_system=color_system) if style else text)
+            i = j
+        return "".join(out)
+
+
+def _changed_runs(old_row, new_row):
+    """Yield (start, end) column ranges where the two rows differ."""
+    width = len(new_row)
+    runs = []
+    x = 0
+    while x < width:
+        if x < len(old_row) and old_row[x] == new_row[x]:
+            x += 1
+            continue
+        start = x
+        while x < width and not (x < len(old_row) and old_row[x] == new_row[x]):
+            x += 1
+        # Never start or stop in the middle of a wide character.
+        if start > 0 and new_row[start][0] == "":
+            start -= 1
+        if x < width and new_row[x][0] == "":
+            x += 1
+        if runs and start - runs[-1][1] < MERGE_GAP:
+            runs[-1] = (runs[-1][0], x)
+        else:
+            runs.append((start, x))
+    return runs
@@ -2,45 +2,75 @@ import time
 from rich.live import Live
 from rich.console import Console
 from ui_renderer import UIRenderer
-from content_generator import ContentGenerator
+from diff_renderer import DiffRenderer
+from content_service import ContentService
+from rolling_wpm import RollingWPM
+from aligner import BandedAligner, SUBSTITUTION, INSERTION, OMISSION
+from text_layout import TextLayout
 
 from input_handler import InputHandler
 
 class GameEngine:
-    def __init__(self, mode="code", time_limit=0, stats_manager=None):
+    def __init__(self, mode="code", time_limit=0, stats_manager=None, backend="live", race=None,
+                 forgiving=False, console=None, input_handler=None, content=None):
+        self.stats_manager = stats_manager
+        self.backend = backend
+        self.race = race
+        # Forgiving mode scores input by edit-distance alignment, so a skipped
+        # or doubled character only costs one error.
+        self.forgiving = forgiving
+        # Setup objects are long-lived: pass them in (and call reset() between
+        # tests) to reuse them instead of rebuilding them for every test.
+        self.console = console or Console()
+        self.input_handler = input_handler or InputHandler()
+        self.content = content or ContentService()
+        self._renderers = {}
+        self.reset(mode, time_limit)
+
+    def reset(self, mode, time_limit=0):
+        """Get ready for a new test, keeping the console, input and content sources."""
         self.mode = mode
         self.time_limit = time_limit
-        self.stats_manager = stats_manager
-        self.console = Console()
-        self.renderer = UIRenderer(mode)
-        self.content_gen = ContentGenerator()
-        self.input_handler = InputHandler()
+        self.renderer = self._renderers.get(mode)
+        if self.renderer is None:
+            self.renderer = self._renderers[mode] = UIRenderer(mode)
         self.running = False
 
         # Game State
         self.target_text = ""
+        self.layout = None
         self.user_input = ""
         self.start_time = 0
         self.wpm = 0.0
+        self.live_wpm = 0.0
+        self.pace = RollingWPM()
+        self.aligner = None
         self.accuracy = 100.0
         self.completed = False
         self.time_remaining = time_limit
 
     def run(self):
         self.running = True
-        if self.time_limit > 0:
-            self.target_text = self.content_gen.get_timed_content(self.mode)
+        if self.race is not None:
+            self.target_text = self.race.target_text
+        elif self.time_limit > 0:
+            self.target_text = self.content.get_timed_content(self.mode)
         else:
-            self.target_text = self.content_gen.get_snippet(self.mode)
+            self.target_text = self.content.get_snippet(self.mode)
+        # Cell widths, clusters and line/column tables, measured once per text.
+        self.layout = TextLayout(self.target_text)
         self.start_time = time.time()
+        self.pace.reset(self.start_time)
 
         self.input_handler.start()
         try:
-            with Live(self._render(), refresh_per_second=20, screen=True) as live:
+            with self._open_display() as live:
                 while self.running:
                     char = self.input_handler.get_char()
                     if char:
                         self.handle_input(char)
+                        if self.race is not None:
+                            self.race.send_progress(self._progress())
 
                     if not self.completed:
                         self.update_stats()
@@ -52,7 +82,9 @@ class GameEngine:
                         if self.time_remaining <= 0:
                             self.completed = True
 
-                    live.update(self._render())
+                    # Push keystrokes out immediately; otherwise let the
+                    # display refresh at its own rate.
+                    live.update(self._render(), refresh=char is not None)
 
                     if self.completed:
                         elapsed = time.time() - self.start_time
@@ -63,20 +95,40 @@ class GameEngine:
         finally:
             self.input_handler.stop()
 
+    def _open_display(self):
+        if self.backend == "diff":
+            return DiffRenderer(self._render(), self.console, refresh_per_second=20)
+        return Live(self._render(), console=self.console, refresh_per_second=20, screen=True)
+
     def _show_results(self, live, elapsed):
+        # Have the next text for this mode ready before the user is back
+        if self.race is None:
+            self.content.prefetch(self.mode, self.time_limit > 0)
+
         # Save stats before showing results
+        new_best = None
         if self.stats_manager and len(self.user_input) > 0:
+            prev_best = self.stats_manager.personal_best(self.mode, self.time_limit)
+            if prev_best is not None and round(self.wpm, 1) > prev_best["wpm"]:
+                new_best = prev_best["wpm"]
             self.stats_manager.record(
                 self.wpm, self.accuracy,
                 len(self.user_input), elapsed,
                 self.mode, self.time_limit,
+                errors=self._error_counts(),
             )
 
+        if self.race is not None:
+            self.race.send_finish(self.wpm, self.accuracy)
+
         results = self.renderer.render_results(
             self.wpm, self.accuracy,
-            len(self.user_input), elapsed, self.time_limit
+            len(self.user_input), elapsed, self.time_limit,
+            trend=self.pace.sparkline(40),
+            errors=self._error_counts(),
+            new_best=new_best,
         )
-        live.update(results)
+        live.update(self._results_view(results))
         live.refresh()
         # Cooldown: ignore all input for 1.5s so fast fingers don't dismiss results
         time.sleep(1.5)
@@ -86,14 +138,45 @@ class GameEngine:
             char = self.input_handler.get_char()
             if char:
                 break
+            if self.race is not None:
+                # Keep the race track moving while the others finish
+                live.update(self._results_view(results))
             time.sleep(0.01)
 
+    def _results_view(self, results):
+        if self.race is None:
+            return results
+        return self.renderer.with_race_track(results, self.race.racers(), len(self.target_text))
+
     def _render(self):
         return self.renderer.render_screen(
             self.target_text, self.user_input,
-            self.wpm, self.accuracy, self.time_remaining
+            self.wpm, self.accuracy, self.time_remaining,
+            racers=self.race.racers() if self.race is not None else None,
+            live_wpm=self.live_wpm, trend=self.pace.sparkline(),
+            alignment=self._get_aligner() if self.forgiving else None,
+            layout=self.layout,
         )
 
+    def _progress(self):
+        """How far through the target text the user is."""
+        if self.forgiving:
+            return self._get_aligner().position
+        return len(self.user_input)
+
+    def _get_aligner(self):
+        if self.aligner is None or self.aligner.target is not self.target_text:
+            self.aligner = BandedAligner(self.target_text)
+            for c in self.user_input:
+                self.aligner.push(c)
+        return self.aligner
+
+    def _error_counts(self):
+        if not self.forgiving:
+            return None
+        counts = self._get_aligner().counts()
+        return {"sub": counts[SUBSTITUTION], "ins": counts[INSERTION], "omit": counts[OMISSION]}
+
     def handle_input(self, char):
         if char == '\x03' or char == '\x1b':
             self.running = False
@@ -102,6 +185,8 @@ class GameEngine:
         # Backspace: \x7f or \x08
         if char == '\x7f' or char == '\x08':
             if len(self.user_input) > 0:
+                if self.forgiving:
+                    self._get_aligner().pop()
                 self.user_input = self.user_input[:-1]
             return
 
@@ -109,22 +194,43 @@ class GameEngine:
         if char == '\r':
             char = '\n'
 
+        if self.forgiving:
+            self._handle_forgiving_input(char)
+            return
+
         # Normal typing
         if len(self.user_input) < len(self.target_text):
             self.user_input += char
+            self.pace.add(time.time())
 
         # Check completion (only in non-timed mode)
         if self.time_limit == 0 and self.user_input == self.target_text:
             self.completed = True
 
+    def _handle_forgiving_input(self, char):
+        aligner = self._get_aligner()
+        # Extra characters are allowed, up to what the alignment band can absorb
+        if aligner.position < len(self.target_text) and len(self.user_input) < len(self.target_text) + aligner.band:
+            self.user_input += char
+            aligner.push(char)
+            self.pace.add(time.time())
+
+        # Done once the alignment reaches the end of the text (non-timed mode)
+        if self.time_limit == 0 and aligner.position == len(self.target_text):
+            self.completed = True
+
     def update_stats(self):
-        elapsed = time.time() - self.start_time
+        now = time.time()
+        elapsed = now - self.start_time
         if elapsed > 0:
             words = len(self.user_input) / 5
             self.wpm = (words / elapsed) * 60
+        self.live_wpm = self.pace.sample(now)
 
         # Calculate accuracy
-        if len(self.user_input) > 0:
+        if self.forgiving:
+            self.accuracy = self._get_aligner().accuracy()
+        elif len(self.user_input) > 0:
             hits = 0
             for i, c in enumerate(self.user_input):
                  if i < len(self.target_text) and c == self.target_text[i]:
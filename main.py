@@ -1,15 +1,101 @@
 import sys
+import asyncio
+import argparse
 from rich.console import Console
 from game_engine import GameEngine
-from menu import show_main_menu, pick_test_options, show_stats_screen
+from menu import show_main_menu, pick_test_options, show_stats_screen, CONTENT_TYPES
 from input_handler import InputHandler
-from stats import StatsManager
+from stats import StatsManager, default_profile_name
+from race_server import serve, DEFAULT_PORT
+from race_client import RaceClient, play_races
+from ui_renderer import UIRenderer
+from content_service import ContentService
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="type.exe", description="a typing test that runs in your terminal.")
+    parser.add_argument(
+        "--renderer", choices=("live", "diff"), default="live",
+        help="typing screen backend: 'live' redraws every frame, "
+             "'diff' only sends changed cells (much less output over SSH)",
+    )
+    parser.add_argument(
+        "--profile", help="whose stats to use (defaults to your login name)",
+    )
+    parser.add_argument(
+        "--forgiving", action="store_true",
+        help="score by aligning your input to the text, so a skipped or doubled "
+             "character counts as one error instead of throwing off the rest",
+    )
+
+    race = parser.add_argument_group("racing")
+    race.add_argument("--serve", action="store_true", help="host a race server instead of playing")
+    race.add_argument("--join", metavar="HOST[:PORT]", help="join a race server")
+    race.add_argument("--name", default=default_profile_name(), help="your name in races")
+    race.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to serve races on")
+    race.add_argument("--mode", choices=[m for _, m, _ in CONTENT_TYPES], default="paragraph",
+                      help="content type for hosted races")
+    race.add_argument("--time", type=int, default=0, help="time limit for hosted races (0 = completion)")
+    race.add_argument("--min-players", type=int, default=2, help="racers needed before a race starts")
+    race.add_argument("--lobby", type=float, default=10.0, help="countdown before each race, in seconds")
+    return parser.parse_args(argv)
+
+def run_server(args, console):
+    console.print(f"Race server on port {args.port} ({args.mode}, "
+                  f"{f'{args.time}s' if args.time else 'completion'}). Ctrl-C to stop.")
+    try:
+        asyncio.run(serve(
+            mode=args.mode, time_limit=args.time, port=args.port,
+            min_players=args.min_players, lobby_time=args.lobby,
+        ))
+    except KeyboardInterrupt:
+        print("\nBye!")
+
+def join_race(args, console, input_handler, engine):
+    host, _, port = args.join.partition(":")
+    client = RaceClient(host, int(port) if port else DEFAULT_PORT, name=args.name)
+    try:
+        client.connect()
+    except ConnectionError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    try:
+        engine.race = client
+
+        def next_race(mode, time_limit):
+            engine.reset(mode, time_limit)
+            return engine
+
+        play_races(client, input_handler, UIRenderer("race"), next_race)
+    finally:
+        client.close()
 
 def main():
+    args = parse_args()
     console = Console()
     input_handler = InputHandler()
-    stats_manager = StatsManager()
+    stats_manager = StatsManager(profile=args.profile)
+
+    if args.serve:
+        run_server(args, console)
+        return
+
+    # One engine for the whole session; texts for every mode are generated in
+    # the background while the menus are up.
+    content = ContentService()
+    engine = GameEngine(
+        stats_manager=stats_manager, backend=args.renderer, forgiving=args.forgiving,
+        console=console, input_handler=input_handler, content=content,
+    )
+
+    if args.join:
+        try:
+            join_race(args, console, input_handler, engine)
+        except KeyboardInterrupt:
+            pass
+        print("Bye!")
+        return
 
+    content.prefetch_all(mode for _, mode, _ in CONTENT_TYPES)
     try:
         while True:
             choice = show_main_menu(console, input_handler)
@@ -23,7 +109,7 @@ def main():
                 mode, time_limit = pick_test_options(console, input_handler)
                 if mode is None:
                     continue
-                engine = GameEngine(mode=mode, time_limit=time_limit, stats_manager=stats_manager)
+                engine.reset(mode, time_limit)
                 engine.run()
 
             elif choice == "stats":
@@ -5,6 +5,8 @@ from rich.text import Text
 from rich.align import Align
 from rich.console import Group
 from input_handler import InputHandler
+from render_cache import CachedRender
+from stats import MOVING_AVERAGES
 
 
 CONTENT_TYPES = [
@@ -28,9 +30,27 @@ MAIN_MENU = [
     ("3", "quit", "Quit"),
 ]
 
+# Menu panels never change, so each is built and rendered once and replayed.
+_PANELS = {}
+
+
+def _cached_panel(name, build):
+    panel = _PANELS.get(name)
+    if panel is None:
+        panel = _PANELS[name] = CachedRender(build())
+    return panel
+
 
 def show_main_menu(console, input_handler):
     """Returns 'test', 'stats', or None (quit)."""
+    panel = _cached_panel("main", _build_main_menu)
+    result = _get_selection(console, input_handler, panel, {k: v for k, v, _ in MAIN_MENU})
+    if result in (None, "quit"):
+        return None
+    return result
+
+
+def _build_main_menu():
     title = Text()
     title.append("╔══════════════════════════════════════╗\n", style="bold cyan")
     title.append("║           TYPEMASTER                 ║\n", style="bold cyan")
@@ -43,17 +63,12 @@ def show_main_menu(console, input_handler):
     title.append("ESC", style="dim bold")
     title.append(" to quit", style="dim")
 
-    panel = Panel(
+    return Panel(
         Align.center(title),
         border_style="cyan",
         padding=(1, 4),
     )
 
-    result = _get_selection(console, input_handler, panel, {k: v for k, v, _ in MAIN_MENU})
-    if result in (None, "quit"):
-        return None
-    return result
-
 
 def pick_test_options(console, input_handler):
     """Returns (mode, time_limit) or (None, None) if cancelled."""
@@ -69,22 +84,36 @@ def pick_test_options(console, input_handler):
 
 
 def show_stats_screen(console, input_handler, stats_manager):
-    """Show the stats dashboard and wait for a keypress to return."""
+    """Show the stats dashboard; [f] and [m] change the graph, any other key returns."""
+    modes = [None] + [mode for _, mode, _ in CONTENT_TYPES]
+    mode_idx = 0
+    ma_idx = 0
     input_handler.start()
     try:
         input_handler.flush()
-        console.clear()
-        console.print(stats_manager.render_dashboard())
         while True:
+            console.clear()
+            console.print(stats_manager.render_dashboard(mode=modes[mode_idx], ma=MOVING_AVERAGES[ma_idx]))
             char = input_handler.get_char()
-            if char:
+            while not char:
+                time.sleep(0.01)
+                char = input_handler.get_char()
+            if char == "f":
+                mode_idx = (mode_idx + 1) % len(modes)
+            elif char == "m":
+                ma_idx = (ma_idx + 1) % len(MOVING_AVERAGES)
+            else:
                 break
-            time.sleep(0.01)
     finally:
         input_handler.stop()
 
 
 def _pick_content_type(console, input_handler):
+    panel = _cached_panel("content_type", _build_content_type_menu)
+    return _get_selection(console, input_handler, panel, {k: v for k, v, _ in CONTENT_TYPES})
+
+
+def _build_content_type_menu():
     title = Text()
     title.append("TYPEMASTER", style="bold cyan")
     title.append("\n\nPick a content type:\n\n", style="white")
@@ -95,16 +124,19 @@ def _pick_content_type(console, input_handler):
     title.append("ESC", style="dim bold")
     title.append(" to go back", style="dim")
 
-    panel = Panel(
+    return Panel(
         Align.center(title),
         border_style="cyan",
         padding=(1, 4),
     )
 
-    return _get_selection(console, input_handler, panel, {k: v for k, v, _ in CONTENT_TYPES})
-
 
 def _pick_test_type(console, input_handler):
+    panel = _cached_panel("test_type", _build_test_type_menu)
+    return _get_selection(console, input_handler, panel, {k: v for k, v, _ in TEST_TYPES})
+
+
+def _build_test_type_menu():
     title = Text()
     title.append("TYPEMASTER", style="bold cyan")
     title.append("\n\nPick a test type:\n\n", style="white")
@@ -115,14 +147,12 @@ def _pick_test_type(console, input_handler):
     title.append("ESC", style="dim bold")
     title.append(" to go back", style="dim")
 
-    panel = Panel(
+    return Panel(
         Align.center(title),
         border_style="cyan",
         padding=(1, 4),
     )
 
-    return _get_selection(console, input_handler, panel, {k: v for k, v, _ in TEST_TYPES})
-
 
 def _get_selection(console, input_handler, panel, options):
     input_handler.start()
@@ -0,0 +1,214 @@
+import asyncio
+import threading
+import time
+from rich.live import Live
+from race_server import DEFAULT_PORT, encode, decode
+
+# A race that started longer ago than this (say, while the results screen
+# was still up) is watched from the lobby instead of joined late.
+LATE_START_GRACE = 1.0
+
+
+class RaceClient:
+    """Connection to a RaceServer, run on a background thread.
+
+    The game loop reads the race state through `racers()` and reports
+    progress with `send_progress()`, which only records the latest position;
+    it is sent at most once every `send_interval` seconds.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, name="anon", send_interval=0.05):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.send_interval = send_interval
+
+        self.my_id = None
+        self.mode = "paragraph"
+        self.target_text = ""
+        self.time_limit = 0
+        self.countdown_until = None
+        self.standings = None
+        self.race_number = 0
+        self.race_started = None
+        self.racing = False
+
+        self.connected = threading.Event()
+        self.race_over = threading.Event()
+        self.closed = threading.Event()
+
+        self._lock = threading.Lock()
+        self._racers = {}   # id -> [name, pos, place]
+        self._pos = 0
+        self._sent_pos = 0
+        self._loop = None
+        self._writer = None
+        self._thread = None
+        self._timeout = None
+
+    def connect(self, timeout=5.0):
+        self._timeout = timeout
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if not self.connected.wait(timeout) or self.closed.is_set():
+            self.close()
+            raise ConnectionError(f"could not join race at {self.host}:{self.port}")
+
+    def close(self):
+        # No writer yet means the connection attempt is still pending; it
+        # gives up on its own timeout.
+        if self._loop is not None and self._writer is not None and not self.closed.is_set():
+            self._loop.call_soon_threadsafe(self._writer.close)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def send_progress(self, pos):
+        self._pos = pos
+
+    def send_finish(self, wpm, accuracy):
+        def finish():
+            self._flush_progress()
+            self._writer.write(encode(["f", round(wpm, 1), round(accuracy, 1)]))
+        if self._loop is not None and not self.closed.is_set():
+            self._loop.call_soon_threadsafe(finish)
+
+    def sit_out(self):
+        """Tell the server we won't race the current race."""
+        if self._loop is not None and not self.closed.is_set():
+            self._loop.call_soon_threadsafe(self._writer.write, encode(["q"]))
+
+    def racers(self):
+        """Snapshot of everyone in the room: (name, pos, place, is_me) tuples."""
+        with self._lock:
+            return [(name, pos, place, rid == self.my_id)
+                    for rid, (name, pos, place) in self._racers.items()]
+
+    # Network thread
+
+    def _run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        try:
+            reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self._timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.closed.set()
+            self.connected.set()
+            return
+
+        self._writer.write(encode(["h", self.name]))
+        sender = asyncio.ensure_future(self._send_loop())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._on_message(decode(line))
+        except (ValueError, IndexError, TypeError, ConnectionError):
+            pass
+        finally:
+            sender.cancel()
+            self._writer.close()
+            self.closed.set()
+            self.connected.set()
+
+    async def _send_loop(self):
+        while True:
+            await asyncio.sleep(self.send_interval)
+            self._flush_progress()
+
+    def _flush_progress(self):
+        pos = self._pos
+        if pos != self._sent_pos:
+            self._sent_pos = pos
+            self._writer.write(encode(["p", pos]))
+
+    def _on_message(self, msg):
+        op = msg[0]
+        with self._lock:
+            if op == "u":
+                for rid, pos in msg[1]:
+                    if rid in self._racers:
+                        self._racers[rid][1] = pos
+            elif op == "w":
+                self.my_id = msg[1]
+                self._racers = {rid: [name, pos, None] for rid, name, pos in msg[2]}
+                self._racers[self.my_id] = [self.name, 0, None]
+                self.racing = msg[3]
+                if msg[4] is not None:
+                    self.countdown_until = time.time() + msg[4]
+                self.connected.set()
+            elif op == "j":
+                self._racers[msg[1]] = [msg[2], 0, None]
+            elif op == "l":
+                self._racers.pop(msg[1], None)
+            elif op == "c":
+                self.countdown_until = None if msg[1] is None else time.time() + msg[1]
+            elif op == "s":
+                self.target_text, self.time_limit, self.mode = msg[1], msg[2], msg[3]
+                for racer in self._racers.values():
+                    racer[1] = 0
+                    racer[2] = None
+                self._pos = self._sent_pos = 0
+                self.countdown_until = None
+                self.standings = None
+                self.racing = True
+                self.race_started = time.time()
+                self.race_number += 1
+                self.race_over.clear()
+            elif op == "f":
+                if msg[1] in self._racers:
+                    self._racers[msg[1]][2] = msg[3]
+            elif op == "e":
+                self.standings = msg[1]
+                self.racing = False
+                self.race_over.set()
+
+
+def play_races(client, input_handler, renderer, make_engine):
+    """Wait in the lobby and run each race until the user quits with ESC.
+
+    `make_engine(mode, time_limit)` builds the GameEngine for a race.
+    """
+    last_race = client.race_number
+    while True:
+        if not _wait_in_lobby(client, input_handler, renderer, last_race):
+            return
+        last_race = client.race_number
+        engine = make_engine(client.mode, client.time_limit)
+        engine.run()
+        if not engine.completed:
+            return
+
+
+def _wait_in_lobby(client, input_handler, renderer, last_race):
+    input_handler.start()
+    try:
+        input_handler.flush()
+        with Live(_lobby(client, renderer), refresh_per_second=10, screen=True) as live:
+            while True:
+                if client.race_number != last_race:
+                    if time.time() - client.race_started <= LATE_START_GRACE:
+                        break
+                    # Started while we were away: watch it and race the next one.
+                    client.sit_out()
+                    last_race = client.race_number
+                if client.closed.is_set():
+                    return False
+                char = input_handler.get_char()
+                if char in ('\x1b', '\x03'):
+                    return False
+                live.update(_lobby(client, renderer))
+                time.sleep(0.05)
+        return True
+    finally:
+        input_handler.stop()
+
+
+def _lobby(client, renderer):
+    countdown = None
+    if client.countdown_until is not None:
+        countdown = max(0, client.countdown_until - time.time())
+    return renderer.render_lobby(client.racers(), countdown, client.racing, client.standings)
@@ -0,0 +1,296 @@
+import asyncio
+import json
+import time
+from content_service import ContentService
+
+DEFAULT_PORT = 7777
+
+# Protocol: one compact JSON array per line, first element is the opcode.
+#
+#   client -> server
+#     ["h", name]              hello, sent once after connecting
+#     ["p", pos]               chars typed so far (latest value wins)
+#     ["f", wpm, acc]          finished the race
+#     ["q"]                    sitting this race out (it started too long ago)
+#
+#   server -> client
+#     ["w", your_id, racers, racing, countdown]
+#                              welcome; racers is [[id, name, pos], ...],
+#                              racing whether a race is under way and
+#                              countdown the seconds until the next one
+#                              starts (null if none is counting down)
+#     ["j", id, name]          someone joined the lobby
+#     ["l", id]                someone left
+#     ["c", seconds]           race starts in `seconds`; null if the countdown
+#                              was called off (too many racers left)
+#     ["s", text, time_limit, mode]
+#                              race started, type `text`
+#     ["u", [[id, pos], ...]]  positions that changed since the last update
+#     ["f", id, wpm, place]    someone finished
+#     ["e", standings]         race over; standings is [[id, name, wpm, acc], ...],
+#                              in finish order for completion races and by
+#                              WPM for timed ones
+
+# Skip a client's updates while this much output is still queued for it; it
+# gets a full snapshot once it catches up.
+HIGH_WATER = 64 * 1024
+
+# Completion races end after this long even if someone never finishes.
+MAX_RACE_TIME = 300
+
+
+def encode(msg):
+    return json.dumps(msg, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode(line):
+    msg = json.loads(line)
+    if not isinstance(msg, list) or not msg or not isinstance(msg[0], str):
+        raise ValueError("malformed message")
+    return msg
+
+
+class Racer:
+    def __init__(self, racer_id, name, writer):
+        self.id = racer_id
+        self.name = name
+        self.writer = writer
+        self.pos = 0
+        self.in_race = False
+        self.finished = None   # (wpm, acc) once done
+        self.place = None
+        self.stale = False
+
+    def send(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def send_update(self, data):
+        # Position updates are the only messages that may be dropped: a slow
+        # reader is marked stale and gets a full snapshot when it catches up.
+        if self.writer.is_closing():
+            return
+        if self.backlogged():
+            self.stale = True
+            return
+        self.writer.write(data)
+
+    def backlogged(self):
+        return self.writer.transport.get_write_buffer_size() > HIGH_WATER
+
+
+class RaceServer:
+    """Runs typing races for everyone connected.
+
+    A race starts `lobby_time` seconds after `min_players` have joined. Progress
+    reports only update a racer's position; a single ticker broadcasts the
+    positions that changed every `broadcast_interval` seconds, so the outgoing
+    traffic doesn't grow with how fast people type.
+    """
+
+    def __init__(self, mode="paragraph", time_limit=0, min_players=2, lobby_time=10.0,
+                 broadcast_interval=0.1, content=None):
+        self.mode = mode
+        self.time_limit = time_limit
+        self.min_players = min_players
+        self.lobby_time = lobby_time
+        self.broadcast_interval = broadcast_interval
+        self.content = content or ContentService()
+
+        self.racers = {}
+        self.target_text = ""
+        self.racing = False
+        self.race_started = 0.0
+        self.places = 0
+        self._next_id = 1
+        self._dirty = set()
+        self._countdown = None
+        self.countdown_ends = None
+        self._server = None
+        self._ticker = None
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host="0.0.0.0", port=DEFAULT_PORT):
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        self._ticker = asyncio.ensure_future(self._broadcast_loop())
+        return self.port
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        for task in (self._ticker, self._countdown):
+            if task is not None:
+                task.cancel()
+        self._server.close()
+        self.content.close()
+        for racer in list(self.racers.values()):
+            racer.writer.close()
+        await self._server.wait_closed()
+
+    # Connections
+
+    async def _handle_client(self, reader, writer):
+        racer = None
+        try:
+            msg = decode(await reader.readline())
+            if msg[0] != "h":
+                return
+            racer = self._join(str(msg[1])[:20], writer)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._on_message(racer, decode(line))
+        except (ValueError, IndexError, TypeError, ConnectionError):
+            pass
+        finally:
+            if racer is not None:
+                self._leave(racer)
+            writer.close()
+
+    def _join(self, name, writer):
+        racer = Racer(self._next_id, name, writer)
+        self._next_id += 1
+        snapshot = [[r.id, r.name, r.pos] for r in self.racers.values()]
+        countdown = None
+        if self.countdown_ends is not None:
+            countdown = max(0.0, self.countdown_ends - time.time())
+        racer.send(encode(["w", racer.id, snapshot, self.racing, countdown]))
+        self._broadcast(encode(["j", racer.id, racer.name]))
+        # Anyone joining mid-race watches it and races in the next one.
+        self.racers[racer.id] = racer
+        self._maybe_start_countdown()
+        return racer
+
+    def _leave(self, racer):
+        self.racers.pop(racer.id, None)
+        self._dirty.discard(racer.id)
+        self._broadcast(encode(["l", racer.id]))
+        if self._countdown is not None and len(self.racers) < self.min_players:
+            self._countdown.cancel()
+            self._cancel_countdown()
+        self._maybe_end_race()
+
+    def _on_message(self, racer, msg):
+        op = msg[0]
+        if op == "p":
+            if racer.in_race and racer.finished is None:
+                racer.pos = max(0, min(int(msg[1]), len(self.target_text)))
+                self._dirty.add(racer.id)
+        elif op == "f":
+            if racer.in_race and racer.finished is None:
+                racer.finished = (float(msg[1]), float(msg[2]))
+                self.places += 1
+                racer.place = self.places
+                self._broadcast(encode(["f", racer.id, racer.finished[0], racer.place]))
+                self._maybe_end_race()
+        elif op == "q":
+            # Watches the rest of this race, like someone who joined mid-race.
+            if racer.in_race and racer.finished is None:
+                racer.in_race = False
+                self._maybe_end_race()
+
+    # Race lifecycle
+
+    def _maybe_start_countdown(self):
+        if self.racing or self._countdown is not None:
+            return
+        if len(self.racers) >= self.min_players:
+            self._countdown = asyncio.ensure_future(self._run_countdown())
+
+    async def _run_countdown(self):
+        self.countdown_ends = time.time() + self.lobby_time
+        self._broadcast(encode(["c", self.lobby_time]))
+        await asyncio.sleep(self.lobby_time)
+        if len(self.racers) < self.min_players:
+            self._cancel_countdown()
+            return
+        self._countdown = None
+        self.countdown_ends = None
+        self._start_race()
+
+    def _cancel_countdown(self):
+        self._countdown = None
+        self.countdown_ends = None
+        self._broadcast(encode(["c", None]))
+
+    def _start_race(self):
+        if self.time_limit > 0:
+            self.target_text = self.content.get_timed_content(self.mode)
+        else:
+            self.target_text = self.content.get_snippet(self.mode)
+        # Generate the next race's text while this one runs
+        self.content.prefetch(self.mode, self.time_limit > 0)
+        self.racing = True
+        self.race_started = time.time()
+        self.places = 0
+        self._dirty.clear()
+        for racer in self.racers.values():
+            racer.pos = 0
+            racer.finished = None
+            racer.place = None
+            racer.in_race = True
+        self._broadcast(encode(["s", self.target_text, self.time_limit, self.mode]))
+
+    def _maybe_end_race(self, force=False):
+        if not self.racing:
+            return
+        racing = [r for r in self.racers.values() if r.in_race]
+        if not force and any(r.finished is None for r in racing):
+            return
+        if self.time_limit > 0:
+            order = lambda r: (r.finished is None, -(r.finished or (0, 0))[0], -r.pos)
+        else:
+            # Same order as the places handed out as people finished.
+            order = lambda r: (r.finished is None, r.place or 0, -r.pos)
+        standings = sorted(racing, key=order)
+        self._broadcast(encode(["e", [
+            [r.id, r.name, *(r.finished or (0.0, 0.0))] for r in standings
+        ]]))
+        self.racing = False
+        for racer in racing:
+            racer.in_race = False
+        self._maybe_start_countdown()
+
+    async def _broadcast_loop(self):
+        while True:
+            await asyncio.sleep(self.broadcast_interval)
+            # Races end for everyone shortly after the clock runs out, even
+            # if some racers never report in.
+            limit = self.time_limit + 5 if self.time_limit > 0 else MAX_RACE_TIME
+            if self.racing and time.time() - self.race_started > limit:
+                self._maybe_end_race(force=True)
+            self._flush_progress()
+
+    def _flush_progress(self):
+        caught_up = {r.id for r in self.racers.values() if r.stale and not r.backlogged()}
+        if caught_up:
+            snapshot = encode(["u", [[r.id, r.pos] for r in self.racers.values()]])
+            for rid in caught_up:
+                self.racers[rid].stale = False
+                self.racers[rid].send(snapshot)
+        if not self._dirty:
+            return
+        update = encode(["u", [[rid, self.racers[rid].pos] for rid in self._dirty]])
+        self._dirty.clear()
+        for racer in self.racers.values():
+            if racer.id not in caught_up:
+                racer.send_update(update)
+
+    def _broadcast(self, data):
+        for racer in self.racers.values():
+            racer.send(data)
+
+
+async def serve(mode="paragraph", time_limit=0, host="0.0.0.0", port=DEFAULT_PORT,
+                min_players=2, lobby_time=10.0):
+    server = RaceServer(mode=mode, time_limit=time_limit, min_players=min_players, lobby_time=lobby_time)
+    await server.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
@@ -0,0 +1,126 @@
+from rich import box as _box
+from rich.measure import Measurement
+from rich.padding import Padding
+from rich.panel import Panel
+from rich.segment import Segment
+
+# Distinct subtitles kept per chrome before the bottom-border cache is reset.
+MAX_SUBTITLES = 64
+
+
+class PanelChrome:
+    """The static parts of a Panel (borders, title, padding), rendered once.
+
+    Border lines are pre-rendered to segments per terminal size and reused
+    every frame; only the body, and the subtitle when it changes, get rendered.
+    A change of size (or of console encoding, which decides between Unicode
+    and ASCII borders) drops everything cached for the old one.
+    """
+
+    def __init__(self, title=None, border_style="none", padding=(0, 1), box=_box.ROUNDED):
+        self.title = title
+        self.border_style = border_style
+        self.padding = Padding.unpack(padding)
+        self.box = box
+        self._size = None
+        self._top = None
+        self._edges = None
+        self._bottoms = {}
+
+    def frame(self, body, subtitle=None):
+        """Wrap `body` in this chrome. Renders the same as the equivalent Panel."""
+        return FramedPanel(self, body, subtitle)
+
+    def _get_parts(self, console, options, subtitle):
+        size = (options.max_width, options.height, options.ascii_only)
+        if size != self._size:
+            self._size = size
+            self._top = None
+            self._bottoms.clear()
+
+        if self._top is None:
+            top, bottom = self._render_border(console, options, None)
+            self._top = top
+            self._bottoms[None] = bottom
+            border_style = console.get_style(self.border_style)
+            # Same box as the borders: Panel swaps in ASCII on non-UTF-8 consoles.
+            box = self.box.substitute(options, safe=console.safe_box)
+            self._edges = (
+                Segment(box.mid_left, border_style),
+                Segment(box.mid_right, border_style),
+            )
+
+        bottom = self._bottoms.get(subtitle)
+        if bottom is None:
+            if len(self._bottoms) >= MAX_SUBTITLES:
+                self._bottoms.clear()
+            bottom = self._bottoms[subtitle] = self._render_border(console, options, subtitle)[1]
+
+        return self._top, self._edges, bottom
+
+    def _render_border(self, console, options, subtitle):
+        # A panel with no room for a body renders as just its top and bottom lines.
+        skeleton = Panel(
+            "",
+            title=self.title,
+            subtitle=subtitle,
+            border_style=self.border_style,
+            box=self.box,
+            padding=0,
+            height=2,
+        )
+        return console.render_lines(skeleton, options.update(height=2), pad=False)
+
+
+class FramedPanel:
+    """A body renderable inside a cached PanelChrome."""
+
+    def __init__(self, chrome, body, subtitle=None):
+        self.chrome = chrome
+        self.body = body
+        self.subtitle = subtitle
+
+    def __rich_console__(self, console, options):
+        top, (line_start, line_end), bottom = self.chrome._get_parts(console, options, self.subtitle)
+
+        body = Padding(self.body, self.chrome.padding) if any(self.chrome.padding) else self.body
+        child_height = options.height - 2 if options.height else None
+        child_options = options.update(width=options.max_width - 2, height=child_height)
+        lines = console.render_lines(body, child_options)
+
+        new_line = Segment.line()
+        yield from top
+        yield new_line
+        for line in lines:
+            yield line_start
+            yield from line
+            yield line_end
+            yield new_line
+        yield from bottom
+        yield new_line
+
+    def __rich_measure__(self, console, options):
+        return Measurement(options.max_width, options.max_width)
+
+
+class CachedRender:
+    """Renders a static renderable once per size and replays the segments."""
+
+    def __init__(self, renderable):
+        self.renderable = renderable
+        self._size = None
+        self._lines = None
+
+    def __rich_console__(self, console, options):
+        size = (options.max_width, options.height, options.ascii_only)
+        if size != self._size:
+            self._size = size
+            self._lines = console.render_lines(self.renderable, options, pad=False)
+
+        new_line = Segment.line()
+        for line in self._lines:
+            yield from line
+            yield new_line
+
+    def __rich_measure__(self, console, options):
+        return Measurement.get(console, options, self.renderable)
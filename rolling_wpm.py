@@ -0,0 +1,90 @@
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class RollingWPM:
+    """WPM over the last `window` seconds, plus a WPM-over-time trace.
+
+    Keystroke times go in a fixed-size ring buffer; each query only drops the
+    keystrokes that have aged out, so it is O(1) amortized. The trace keeps at
+    most `max_samples` points: when it fills up, neighbouring samples are
+    averaged together and the sampling interval doubles, so memory stays
+    constant however long the session runs.
+    """
+
+    def __init__(self, window=5.0, capacity=1024, sample_interval=1.0, max_samples=64):
+        self.window = window
+        self.capacity = capacity
+        self.sample_interval = sample_interval
+        self.max_samples = max_samples
+
+        self._times = [0.0] * capacity
+        self._head = 0      # next slot to write
+        self._count = 0     # keystrokes currently inside the window
+        self.start_time = None
+
+        self.samples = []
+        self._next_sample = None
+        self._spark_cache = None
+
+    def reset(self, start_time):
+        self._head = 0
+        self._count = 0
+        self.start_time = start_time
+        self.samples = []
+        self._next_sample = start_time + self.sample_interval
+        self._spark_cache = None
+
+    def add(self, now):
+        if self.start_time is None:
+            self.reset(now)
+        self._times[self._head] = now
+        self._head = (self._head + 1) % self.capacity
+        # A full buffer simply forgets its oldest keystroke.
+        self._count = min(self._count + 1, self.capacity)
+
+    def wpm(self, now):
+        if self.start_time is None:
+            return 0.0
+        cutoff = now - self.window
+        while self._count and self._times[(self._head - self._count) % self.capacity] < cutoff:
+            self._count -= 1
+        span = min(self.window, now - self.start_time)
+        if span <= 0:
+            return 0.0
+        return (self._count / 5) / span * 60
+
+    def sample(self, now):
+        """Record the current rolling WPM if a sample is due; returns it."""
+        wpm = self.wpm(now)
+        if self._next_sample is not None and now >= self._next_sample:
+            self.samples.append(wpm)
+            self._next_sample += self.sample_interval
+            if len(self.samples) >= self.max_samples:
+                pairs = zip(self.samples[0::2], self.samples[1::2])
+                self.samples = [(a + b) / 2 for a, b in pairs]
+                self.sample_interval *= 2
+                self._next_sample = self.start_time + (len(self.samples) + 1) * self.sample_interval
+            self._spark_cache = None
+        return wpm
+
+    def sparkline(self, width=20):
+        """The trace as block characters, at most `width` wide."""
+        if self._spark_cache is not None and self._spark_cache[0] == width:
+            return self._spark_cache[1]
+        line = sparkline(self.samples, width)
+        self._spark_cache = (width, line)
+        return line
+
+
+def sparkline(values, width=20):
+    if not values:
+        return ""
+    if len(values) > width:
+        step = len(values) / width
+        values = [
+            sum(values[int(i * step):int((i + 1) * step)]) / (int((i + 1) * step) - int(i * step))
+            for i in range(width)
+        ]
+    hi = max(values) or 1
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(top, int(v / hi * top + 0.5))] for v in values)
@@ -1,6 +1,11 @@
 import json
 import os
+import re
 import time
+import heapq
+import bisect
+import getpass
+from itertools import islice
 from datetime import datetime
 from rich.panel import Panel
 from rich.text import Text
@@ -8,27 +13,121 @@ from rich.console import Group
 from rich.align import Align
 from rich.table import Table
 
+# Where history lived before profiles; imported into the first profile used.
 STATS_FILE = os.path.join(os.path.dirname(__file__), "typing_history.json")
 
+# One shard per profile plus a small index holding each profile's summary.
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), "typing_profiles")
+INDEX_FILE = "index.json"
+
+# Fastest tests kept per (mode, time limit) in the profile index.
+TOP_K = 10
+
+# Moving-average windows the history graph cycles through (0 = raw).
+MOVING_AVERAGES = (0, 5, 10, 50)
+
+# Downsampled graph series kept before the cache is reset.
+MAX_CACHED_SERIES = 32
+
 
 class StatsManager:
-    def __init__(self):
-        self.history = self._load()
-
-    def _load(self):
-        if os.path.exists(STATS_FILE):
-            try:
-                with open(STATS_FILE, "r") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return []
-        return []
-
-    def _save(self):
-        with open(STATS_FILE, "w") as f:
-            json.dump(self.history, f, indent=2)
-
-    def record(self, wpm, accuracy, chars_typed, elapsed, mode, time_limit):
+    """Test history for one named profile.
+
+    Only the profile index is read on startup. A profile's history shard is
+    read the first time `history` is used, i.e. when its stats are viewed or
+    a test is recorded. The index keeps a running summary per profile, which
+    is enough for the cross-profile leaderboard.
+    """
+
+    def __init__(self, profile=None, profiles_dir=None):
+        self.profiles_dir = profiles_dir or PROFILES_DIR
+        self.profile = profile or default_profile_name()
+        self.index = self._load_index()
+        self._history = None
+        self._series_cache = {}
+
+    @property
+    def history(self):
+        if self._history is None:
+            self._history = _read_json(self._shard_path(self.profile), [])
+        return self._history
+
+    def switch_profile(self, name):
+        self.profile = name
+        self._history = None
+        self._series_cache.clear()
+
+    def profiles(self):
+        return sorted(self.index)
+
+    def summary(self, name=None):
+        entry = self.index.get(name or self.profile)
+        return entry["summary"] if entry else _empty_summary()
+
+    def leaderboard(self, n=10, key="best_wpm"):
+        """Top `n` profiles by a summary field, straight from the index."""
+        rows = [(name, e["summary"]) for name, e in self.index.items() if e["summary"]["tests"]]
+        return heapq.nlargest(n, rows, key=lambda row: _summary_value(row[1], key))
+
+    def personal_best(self, mode, time_limit):
+        """Fastest test for this mode and time limit, or None."""
+        top = self._bests().get(_category(mode, time_limit))
+        return top[0] if top else None
+
+    def top_tests(self, mode=None, n=TOP_K):
+        """Fastest tests overall or for one mode, merged from the per-category lists."""
+        lists = [top for key, top in self._bests().items() if mode is None or key.split("/")[0] == mode]
+        return list(islice(heapq.merge(*lists, key=lambda e: -e["wpm"]), n))
+
+    def _bests(self):
+        entry = self.index.get(self.profile)
+        if entry is None:
+            return {}
+        if "bests" not in entry:
+            # Index written before bests were tracked: build them once.
+            entry["bests"] = {}
+            for e in self.history:
+                _insert_top(entry["bests"], e)
+        return entry["bests"]
+
+    def _error_totals(self):
+        summary = self.summary()
+        if "errors" not in summary:
+            # Index written before error totals were kept: count them once.
+            summary["errors"] = _empty_errors()
+            for e in self.history:
+                _add_errors(summary["errors"], e)
+        return summary["errors"]
+
+    def _load_index(self):
+        index = _read_json(os.path.join(self.profiles_dir, INDEX_FILE), None)
+        if index is not None:
+            return index
+
+        # First run with profiles: carry the old shared history over.
+        index = {}
+        legacy = _read_json(STATS_FILE, [])
+        if legacy:
+            self.index = index
+            self._write_shard(self.profile, legacy)
+            index[self.profile]["summary"] = _summarize(legacy)
+            for entry in legacy:
+                _insert_top(index[self.profile]["bests"], entry)
+            _write_json(os.path.join(self.profiles_dir, INDEX_FILE), index)
+        return index
+
+    def _shard_path(self, name):
+        entry = self.index.get(name)
+        filename = entry["file"] if entry else _shard_filename(name, self.index)
+        return os.path.join(self.profiles_dir, filename)
+
+    def _write_shard(self, name, history):
+        path = self._shard_path(name)
+        if name not in self.index:
+            self.index[name] = {"file": os.path.basename(path), "summary": _empty_summary(), "bests": {}}
+        _write_json(path, history)
+
+    def record(self, wpm, accuracy, chars_typed, elapsed, mode, time_limit, errors=None):
         entry = {
             "timestamp": datetime.now().isoformat(),
             "wpm": round(wpm, 1),
@@ -38,24 +137,69 @@ class StatsManager:
             "mode": mode,
             "time_limit": time_limit,
         }
+        # Only forgiving-mode tests classify their errors
+        if errors is not None:
+            entry["errors"] = errors
         self.history.append(entry)
-        self._save()
-
-    def render_dashboard(self):
+        self._series_cache.clear()
+
+        # Other people may have recorded tests since we read the index.
+        self.index = _read_json(os.path.join(self.profiles_dir, INDEX_FILE), self.index)
+        rebuild_bests = self.profile in self.index and "bests" not in self.index[self.profile]
+        rebuild_errors = self.profile in self.index and "errors" not in self.index[self.profile]["summary"]
+        self._write_shard(self.profile, self.history)
+        _add_to_summary(self.index[self.profile]["summary"], entry)
+        if rebuild_bests:
+            self._bests()   # built from the history, which already has this test
+        else:
+            _insert_top(self.index[self.profile]["bests"], entry)
+        if rebuild_errors:
+            self._error_totals()
+        _write_json(os.path.join(self.profiles_dir, INDEX_FILE), self.index)
+
+    def graph_series(self, points, mode=None, ma=0):
+        """WPM and accuracy series for the history graph, at most `points` long.
+
+        Covers every test matching `mode` (None = all), smoothed with a
+        `ma`-test moving average, then downsampled with LTTB. Results are
+        cached per (filter, points, ma) until the next test is recorded.
+        """
+        key = (mode, points, ma)
+        cached = self._series_cache.get(key)
+        if cached is not None:
+            return cached
+
+        entries = self.history if mode is None else [e for e in self.history if e["mode"] == mode]
+        wpms = [e["wpm"] for e in entries]
+        accs = [e["accuracy"] for e in entries]
+        if ma > 1:
+            wpms = moving_average(wpms, ma)
+            accs = moving_average(accs, ma)
+        keep = lttb(wpms, points)
+        series = ([wpms[i] for i in keep], [accs[i] for i in keep])
+
+        if len(self._series_cache) >= MAX_CACHED_SERIES:
+            self._series_cache.clear()
+        self._series_cache[key] = series
+        return series
+
+    def render_dashboard(self, mode=None, ma=0):
         if not self.history:
             return self._render_empty()
 
         entries = self.history
-        wpms = [e["wpm"] for e in entries]
-        accs = [e["accuracy"] for e in entries]
-
-        total_tests = len(entries)
-        avg_wpm = sum(wpms) / total_tests
-        best_wpm = max(wpms)
-        avg_acc = sum(accs) / total_tests
-        best_acc = max(accs)
-        total_chars = sum(e["chars"] for e in entries)
-        total_time = sum(e["elapsed"] for e in entries)
+        # Totals and bests are kept up to date in the index, no need to rescan
+        summary = self.summary()
+        if not summary["tests"]:
+            summary = _summarize(entries)
+
+        total_tests = summary["tests"]
+        avg_wpm = summary["wpm_sum"] / total_tests
+        best_wpm = summary["best_wpm"]
+        avg_acc = summary["acc_sum"] / total_tests
+        best_acc = summary["best_acc"]
+        total_chars = summary["chars"]
+        total_time = summary["time"]
 
         # Main Layout
         layout = Table.grid(padding=1, expand=True)
@@ -79,15 +223,22 @@ class StatsManager:
         stats_table.add_row("Total Time", _fmt_time(total_time), "", "")
         stats_table.add_row("Avg WPM", f"{avg_wpm:.0f}", "Best WPM", f"{best_wpm:.0f}")
         stats_table.add_row("Avg Acc", f"{avg_acc:.1f}%", "Best Acc", f"{best_acc:.1f}%")
+        errors = summary["errors"] if "errors" in summary else self._error_totals()
+        if errors["tests"]:
+            stats_table.add_row(
+                "Errors", f"{errors['sub']} wrong",
+                "", f"{errors['ins']} extra · {errors['omit']} skipped",
+            )
         
         layout.add_row(Panel(stats_table, title="Overview", border_style="blue"))
 
-        # Combined WPM & Accuracy Bar Graph
-        recent_wpms = wpms[-30:]
-        recent_accs = accs[-30:]
+        # Combined WPM & Accuracy Bar Graph, downsampled to fit the screen
+        graph_title = f"History: {mode or 'all modes'}"
+        if ma > 1:
+            graph_title += f", {ma}-test average"
         layout.add_row(Panel(
-            render_bar_graph(recent_wpms, recent_accs),
-            title="History",
+            HistoryGraph(self, mode=mode, ma=ma),
+            title=graph_title,
             border_style="dim",
         ))
 
@@ -116,15 +267,40 @@ class StatsManager:
 
         layout.add_row(Panel(recent_table, border_style="white"))
 
-        layout.add_row(Align.center(Text("\nPress any key to go back", style="dim italic")))
+        top = self.top_tests(mode)
+        if top:
+            layout.add_row(Panel(_render_top_tests(top), title=f"Top {TOP_K}: {mode or 'all modes'}", border_style="yellow"))
+
+        if len(self.index) > 1:
+            layout.add_row(Panel(self._render_leaderboard(), title="Profiles", border_style="magenta"))
+
+        layout.add_row(Align.center(Text("\n[f] filter mode  [m] moving average  any other key to go back", style="dim italic")))
 
         return Panel(
             layout,
-            title="TYPEMASTER STATS",
+            title=f"TYPEMASTER STATS: {self.profile}",
             border_style="bright_cyan",
             padding=(1, 2),
         )
 
+    def _render_leaderboard(self):
+        table = Table(box=None, padding=(0, 2), expand=True)
+        table.add_column("#", style="dim", justify="right")
+        table.add_column("Profile")
+        table.add_column("Best WPM", style="bold white", justify="right")
+        table.add_column("Avg WPM", justify="right")
+        table.add_column("Tests", style="dim", justify="right")
+
+        for rank, (name, summary) in enumerate(self.leaderboard(), 1):
+            table.add_row(
+                str(rank),
+                Text(name, style="bold yellow" if name == self.profile else "white"),
+                f"{summary['best_wpm']:.0f}",
+                f"{_summary_value(summary, 'avg_wpm'):.0f}",
+                str(summary["tests"]),
+            )
+        return table
+
     def _render_empty(self):
         content = Text()
         content.append("\n\n")
@@ -135,12 +311,102 @@ class StatsManager:
 
         return Panel(
             Align.center(content),
-            title="TYPEMASTER STATS",
+            title=f"TYPEMASTER STATS: {self.profile}",
             border_style="bright_cyan",
             padding=(1, 2),
         )
 
 
+class HistoryGraph:
+    """History bar graph with as many bars as fit the width it's given."""
+
+    def __init__(self, stats_manager, mode=None, ma=0, height=8):
+        self.stats_manager = stats_manager
+        self.mode = mode
+        self.ma = ma
+        self.height = height
+
+    def __rich_console__(self, console, options):
+        # Axis labels and borders take 11 columns, each bar pair 3.
+        points = max(2, (options.max_width - 11) // 3)
+        wpms, accs = self.stats_manager.graph_series(points, mode=self.mode, ma=self.ma)
+        if not wpms:
+            yield Text("  No tests in this mode yet.", style="dim")
+            return
+        yield render_bar_graph(wpms, accs, self.height)
+
+
+def moving_average(values, window):
+    """Trailing moving average; the first points average what's available."""
+    out = []
+    total = 0.0
+    for i, v in enumerate(values):
+        total += v
+        if i >= window:
+            total -= values[i - window]
+        out.append(total / min(i + 1, window))
+    return out
+
+
+def lttb(values, threshold):
+    """Indices of `threshold` points of `values` picked by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points, and from each bucket in between the
+    point forming the largest triangle with the previous pick and the average
+    of the next bucket, which preserves peaks and dips that plain striding
+    would drop.
+    """
+    n = len(values)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:threshold]
+
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        ay = values[a]
+        best_area = -1.0
+        best = next_start
+        for j in range(int(i * every) + 1, next_start):
+            area = abs((a - avg_x) * (values[j] - ay) - (a - j) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def _render_top_tests(top):
+    table = Table(box=None, padding=(0, 2), expand=True)
+    table.add_column("#", style="dim", justify="right")
+    table.add_column("WPM", style="bold white", justify="right")
+    table.add_column("Acc", justify="right")
+    table.add_column("Mode", style="dim cyan")
+    table.add_column("Test", style="dim")
+    table.add_column("Date", style="dim")
+
+    for rank, e in enumerate(top, 1):
+        acc_style = "green" if e["accuracy"] >= 95 else "yellow" if e["accuracy"] >= 85 else "red"
+        table.add_row(
+            str(rank),
+            f"{e['wpm']:.0f}",
+            Text(f"{e['accuracy']:.0f}%", style=acc_style),
+            e["mode"],
+            f"{e['time_limit']}s" if e["time_limit"] > 0 else "completion",
+            datetime.fromisoformat(e["timestamp"]).strftime("%b %d %H:%M"),
+        )
+    return table
+
+
 def render_bar_graph(wpms, accs, height=8):
     """Render WPM and Accuracy as paired vertical bars on a single graph."""
     if not wpms:
@@ -215,6 +481,100 @@ def render_bar_graph(wpms, accs, height=8):
     return result
 
 
+def default_profile_name():
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):
+        return "default"
+
+
+def _shard_filename(name, index):
+    slug = re.sub(r"[^A-Za-z0-9_-]", "_", name)[:40] or "profile"
+    taken = {e["file"] for e in index.values()} | {INDEX_FILE}
+    filename = f"{slug}.json"
+    n = 2
+    while filename in taken:
+        filename = f"{slug}-{n}.json"
+        n += 1
+    return filename
+
+
+def _empty_summary():
+    return {"tests": 0, "chars": 0, "time": 0.0, "wpm_sum": 0.0, "acc_sum": 0.0,
+            "best_wpm": 0.0, "best_acc": 0.0, "last": None, "errors": _empty_errors()}
+
+
+def _empty_errors():
+    return {"tests": 0, "sub": 0, "ins": 0, "omit": 0}
+
+
+def _add_errors(totals, entry):
+    errors = entry.get("errors")
+    if errors:
+        totals["tests"] += 1
+        for key in ("sub", "ins", "omit"):
+            totals[key] += errors[key]
+
+
+def _add_to_summary(summary, entry):
+    summary["tests"] += 1
+    summary["chars"] += entry["chars"]
+    summary["time"] += entry["elapsed"]
+    summary["wpm_sum"] += entry["wpm"]
+    summary["acc_sum"] += entry["accuracy"]
+    summary["best_wpm"] = max(summary["best_wpm"], entry["wpm"])
+    summary["best_acc"] = max(summary["best_acc"], entry["accuracy"])
+    summary["last"] = entry["timestamp"]
+    if "errors" in summary:
+        _add_errors(summary["errors"], entry)
+
+
+def _summarize(entries):
+    summary = _empty_summary()
+    for entry in entries:
+        _add_to_summary(summary, entry)
+    return summary
+
+
+def _summary_value(summary, key):
+    if key == "avg_wpm":
+        return summary["wpm_sum"] / summary["tests"] if summary["tests"] else 0.0
+    return summary[key]
+
+
+def _category(mode, time_limit):
+    return f"{mode}/{time_limit}"
+
+
+def _insert_top(bests, entry):
+    """Insert a test into its category's top-K list, kept fastest first."""
+    top = bests.setdefault(_category(entry["mode"], entry["time_limit"]), [])
+    keys = [-e["wpm"] for e in top]
+    pos = bisect.bisect_right(keys, -entry["wpm"])
+    if pos < TOP_K:
+        top.insert(pos, {k: entry[k] for k in ("wpm", "accuracy", "mode", "time_limit", "timestamp")})
+        del top[TOP_K:]
+
+
+def _read_json(path, default):
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return default
+    return default
+
+
+def _write_json(path, data):
+    # Write then rename, so a reader never sees a half-written file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
 def _fmt_time(seconds):
     if seconds < 60:
         return f"{seconds:.0f}s"
@@ -0,0 +1,76 @@
+import random
+import unittest
+from aligner import BandedAligner, MATCH, SUBSTITUTION, INSERTION, OMISSION
+from game_engine import GameEngine
+
+
+def _align(target, typed):
+    aligner = BandedAligner(target)
+    for c in typed:
+        aligner.push(c)
+    return aligner
+
+
+class TestBandedAligner(unittest.TestCase):
+    def test_skipped_character_is_one_omission(self):
+        aligner = _align("hello world", "helo world")
+        counts = aligner.counts()
+        self.assertEqual(counts[OMISSION], 1)
+        self.assertEqual(counts[MATCH], 10)
+        self.assertEqual(aligner.position, 11)
+
+    def test_doubled_character_is_one_insertion(self):
+        counts = _align("hello world", "helllo world").counts()
+        self.assertEqual((counts[INSERTION], counts[MATCH]), (1, 11))
+
+    def test_wrong_character_is_substitution(self):
+        ops = _align("hello world", "hello wrrld").ops()
+        self.assertEqual([op for op, _, _ in ops if op != MATCH], [SUBSTITUTION])
+        self.assertEqual(ops[7], (SUBSTITUTION, 7, "r"))
+
+    def test_backspace_restores_previous_alignment(self):
+        aligner = _align("hello world", "helo")
+        before = (aligner.position, list(aligner.ops()))
+        aligner.push("x")
+        aligner.ops()
+        aligner.pop()
+        self.assertEqual((aligner.position, aligner.ops()), before)
+
+    def test_incremental_ops_and_counts_match_a_fresh_alignment(self):
+        rng = random.Random(3)
+        target = "".join(rng.choice("abc de") for _ in range(300))
+        aligner = BandedAligner(target)
+        for step in range(600):
+            if aligner.typed and rng.random() < 0.2:
+                aligner.pop()
+            else:
+                aligner.push(rng.choice("abc de"))
+            if step % 7 == 0:
+                aligner.ops()
+            fresh = _align(target, aligner.typed)
+            self.assertEqual(aligner.ops(), fresh.ops())
+            counts = {op: 0 for op in (MATCH, SUBSTITUTION, INSERTION, OMISSION)}
+            for op, _, _ in fresh.ops():
+                counts[op] += 1
+            self.assertEqual(aligner.counts(), counts)
+
+    def test_band_follows_accumulated_drift(self):
+        rng = random.Random(7)
+        target = "".join(rng.choice("abcdefghij ") for _ in range(2000))
+        # Five separate skips of 5 chars: far more drift in total than the band.
+        typed = "".join(target[i + 5:i + 400] for i in range(0, 2000, 400))
+        aligner = _align(target, typed)
+        self.assertEqual(aligner.position, len(target))
+        self.assertEqual(aligner.counts()[OMISSION], 25)
+
+    def test_forgiving_engine(self):
+        engine = GameEngine(forgiving=True)
+        engine.target_text = "hello world"
+        for c in "helo wrld":
+            engine.handle_input(c)
+        engine.update_stats()
+        self.assertAlmostEqual(engine.accuracy, 9 / 11 * 100, delta=0.1)
+        self.assertTrue(engine.completed)
+
+if __name__ == '__main__':
+    unittest.main()
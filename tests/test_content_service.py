@@ -0,0 +1,49 @@
+import threading
+import unittest
+from content_service import ContentService
+
+
+class SlowGenerator:
+    """Counts calls and blocks until released, like a big corpus would."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def get_snippet(self, mode):
+        self.calls += 1
+        self.release.wait(5)
+        return f"{mode} snippet {self.calls}"
+
+    def get_timed_content(self, mode):
+        return self.get_snippet(mode) + " (timed)"
+
+
+class TestContentService(unittest.TestCase):
+    def test_prefetched_text_is_handed_out(self):
+        gen = SlowGenerator()
+        gen.release.set()
+        service = ContentService(gen)
+        service.prefetch("code", False)
+        self.assertEqual(service.get_snippet("code"), "code snippet 1")
+        self.assertEqual(gen.calls, 1)
+        service.close()
+
+    def test_take_waits_for_pending_prefetch(self):
+        gen = SlowGenerator()
+        service = ContentService(gen)
+        service.prefetch("line", True)
+        threading.Timer(0.05, gen.release.set).start()
+        self.assertEqual(service.get_timed_content("line"), "line snippet 1 (timed)")
+        self.assertEqual(gen.calls, 1)
+        service.close()
+
+    def test_cold_miss_generates_inline(self):
+        gen = SlowGenerator()
+        gen.release.set()
+        service = ContentService(gen)
+        self.assertEqual(service.get_snippet("shell"), "shell snippet 1")
+        self.assertIsNone(service._worker)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import unittest
+from rich.console import Console
+from diff_renderer import DiffRenderer
+from ui_renderer import UIRenderer
+
+
+def _console(width=60, height=12):
+    return Console(file=io.StringIO(), width=width, height=height,
+                   force_terminal=True, color_system="truecolor")
+
+
+class TestDiffRenderer(unittest.TestCase):
+    def test_keystroke_sends_only_changed_cells(self):
+        console = _console()
+        renderer = UIRenderer("line")
+        target = "The quick brown fox jumps over the lazy dog."
+        display = DiffRenderer(renderer.render_screen(target, "", 0, 100), console)
+        display.refresh()
+        full = display.frame_bytes
+
+        display.update(renderer.render_screen(target, "T", 0, 100), refresh=True)
+        self.assertGreater(display.frame_bytes, 0)
+        self.assertLess(display.frame_bytes * 10, full)
+
+    def test_unchanged_frame_writes_nothing(self):
+        console = _console()
+        renderer = UIRenderer("paragraph")
+        frame = renderer.render_screen("hello world", "hel", 30, 100)
+        display = DiffRenderer(frame, console)
+        display.refresh()
+        display.update(renderer.render_screen("hello world", "hel", 30, 100), refresh=True)
+        self.assertEqual(display.frame_bytes, 0)
+
+    def test_resize_forces_full_redraw(self):
+        console = _console()
+        renderer = UIRenderer("shell")
+        display = DiffRenderer(renderer.render_screen("ls -la", "l", 0, 100), console)
+        display.refresh()
+        before = len(console.file.getvalue())
+        console.size = (70, 12)
+        display.update(renderer.render_screen("ls -la", "l", 0, 100), refresh=True)
+        self.assertTrue(console.file.getvalue()[before:].startswith("\x1b[2J"))
+        self.assertEqual(len(display._cells[0]), 70)
+
+    def test_grapheme_clusters_fill_their_cells(self):
+        console = _console()
+        renderer = UIRenderer("line")
+        target = "cafe\u0301 for the \U0001f468\u200d\U0001f469\u200d\U0001f467 family"
+        display = DiffRenderer(renderer.render_screen(target, "", 0, 100), console)
+        display.refresh()
+        display.update(renderer.render_screen(target, "caf", 0, 100), refresh=True)
+        for row in display._cells:
+            self.assertEqual(len(row), 60)
+        row = next(r for r in display._cells if any(ch == "e\u0301" for ch, _ in r))
+        self.assertEqual(row[-1][0], "│")
+        emoji = [ch for ch, _ in row].index("\U0001f468\u200d\U0001f469\u200d\U0001f467")
+        self.assertEqual(row[emoji + 1][0], "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -44,5 +44,18 @@ class TestGameMechanics(unittest.TestCase):
         engine.handle_input('\x7f') # Backspace
         self.assertEqual(engine.user_input, "ab")
 
+    def test_reset_reuses_setup_objects(self):
+        engine = GameEngine(mode="code")
+        console, renderer = engine.console, engine.renderer
+        engine.user_input = "abc"
+        engine.completed = True
+
+        engine.reset("line", 30)
+        self.assertEqual((engine.mode, engine.time_limit, engine.user_input), ("line", 30, ""))
+        self.assertFalse(engine.completed)
+        self.assertIs(engine.console, console)
+        engine.reset("code")
+        self.assertIs(engine.renderer, renderer)
+
 if __name__ == '__main__':
     unittest.main()
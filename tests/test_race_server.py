@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+from race_server import RaceServer, encode, decode
+from race_client import RaceClient
+
+
+async def _connect(port, name):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(encode(["h", name]))
+    return reader, writer
+
+
+async def _read_until(reader, op):
+    while True:
+        msg = decode(await asyncio.wait_for(reader.readline(), 5))
+        if msg[0] == op:
+            return msg
+
+
+class TestRaceServer(unittest.TestCase):
+    def test_race_start_progress_and_finish(self):
+        async def scenario():
+            server = RaceServer(mode="line", min_players=2, lobby_time=0, broadcast_interval=0.05)
+            port = await server.start("127.0.0.1", 0)
+            try:
+                r1, w1 = await _connect(port, "alice")
+                r2, w2 = await _connect(port, "bob")
+                me = (await _read_until(r1, "w"))[1]
+                start1 = await _read_until(r1, "s")
+                start2 = await _read_until(r2, "s")
+                self.assertEqual(start1[1], start2[1])
+                text = start1[1]
+
+                # A burst of progress reports is coalesced into one update.
+                for pos in range(1, 6):
+                    w1.write(encode(["p", pos]))
+                update = await _read_until(r2, "u")
+                self.assertEqual(update[1], [[me, 5]])
+
+                w1.write(encode(["p", len(text)]))
+                w1.write(encode(["f", 80.0, 99.0]))
+                finished = await _read_until(r2, "f")
+                self.assertEqual((finished[1], finished[3]), (me, 1))
+
+                w2.write(encode(["f", 40.0, 90.0]))
+                standings = (await _read_until(r2, "e"))[1]
+                self.assertEqual([s[1] for s in standings], ["alice", "bob"])
+                for w in (w1, w2):
+                    w.close()
+            finally:
+                await server.close()
+
+        asyncio.run(scenario())
+
+    def test_standings_follow_finish_order_in_completion_races(self):
+        async def race(time_limit):
+            server = RaceServer(time_limit=time_limit, min_players=2, lobby_time=0, broadcast_interval=0.05)
+            port = await server.start("127.0.0.1", 0)
+            try:
+                r1, w1 = await _connect(port, "alice")
+                r2, w2 = await _connect(port, "bob")
+                await _read_until(r2, "s")
+                w1.write(encode(["f", 40.0, 99.0]))
+                await _read_until(r2, "f")
+                w2.write(encode(["f", 80.0, 99.0]))
+                standings = (await _read_until(r2, "e"))[1]
+                for w in (w1, w2):
+                    w.close()
+                return [s[1] for s in standings]
+            finally:
+                await server.close()
+
+        self.assertEqual(asyncio.run(race(0)), ["alice", "bob"])
+        self.assertEqual(asyncio.run(race(30)), ["bob", "alice"])
+
+    def test_welcome_reports_race_state(self):
+        async def scenario():
+            server = RaceServer(min_players=2, lobby_time=0, broadcast_interval=0.05)
+            port = await server.start("127.0.0.1", 0)
+            try:
+                r1, w1 = await _connect(port, "alice")
+                self.assertEqual((await _read_until(r1, "w"))[3:], [False, None])
+                r2, w2 = await _connect(port, "bob")
+                await _read_until(r1, "s")
+                r3, w3 = await _connect(port, "carol")
+                self.assertEqual((await _read_until(r3, "w"))[3:], [True, None])
+
+                # Sitting the race out lets it end without waiting for bob.
+                w2.write(encode(["q"]))
+                w1.write(encode(["f", 60.0, 95.0]))
+                standings = (await _read_until(r3, "e"))[1]
+                self.assertEqual([s[1] for s in standings], ["alice"])
+                for w in (w1, w2, w3):
+                    w.close()
+            finally:
+                await server.close()
+
+        asyncio.run(scenario())
+
+        async def countdown():
+            server = RaceServer(min_players=2, lobby_time=30, broadcast_interval=0.05)
+            port = await server.start("127.0.0.1", 0)
+            try:
+                r1, w1 = await _connect(port, "alice")
+                r2, w2 = await _connect(port, "bob")
+                self.assertEqual((await _read_until(r1, "c"))[1], 30)
+                r3, w3 = await _connect(port, "carol")
+                racing, seconds = (await _read_until(r3, "w"))[3:]
+                self.assertFalse(racing)
+                self.assertTrue(0 < seconds <= 30)
+
+                # Dropping below min_players calls the countdown off.
+                w2.close()
+                w3.close()
+                self.assertEqual((await _read_until(r1, "c"))[1], None)
+                self.assertIsNone(server.countdown_ends)
+                w1.close()
+            finally:
+                await server.close()
+
+        asyncio.run(countdown())
+
+    def test_many_clients(self):
+        async def scenario():
+            server = RaceServer(min_players=200, lobby_time=0, broadcast_interval=0.05)
+            port = await server.start("127.0.0.1", 0)
+            try:
+                conns = [await _connect(port, f"racer{i}") for i in range(200)]
+                starts = await asyncio.gather(*(_read_until(r, "s") for r, _ in conns))
+                self.assertEqual(len({s[1] for s in starts}), 1)
+
+                for i, (_, w) in enumerate(conns):
+                    w.write(encode(["p", 1 + i % 3]))
+                updates = await asyncio.gather(*(_read_until(r, "u") for r, _ in conns))
+                self.assertTrue(all(u[1] for u in updates))
+                for _, w in conns:
+                    w.close()
+            finally:
+                await server.close()
+
+        asyncio.run(scenario())
+
+    def test_threaded_client(self):
+        loop = asyncio.new_event_loop()
+        server = RaceServer(mode="shell", min_players=2, lobby_time=0, broadcast_interval=0.02)
+        port = loop.run_until_complete(server.start("127.0.0.1", 0))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        a = RaceClient("127.0.0.1", port, name="alice", send_interval=0.01)
+        b = RaceClient("127.0.0.1", port, name="bob", send_interval=0.01)
+        try:
+            a.connect()
+            b.connect()
+            deadline = time.time() + 5
+            while not (a.racing and b.racing) and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(a.target_text, b.target_text)
+            self.assertEqual(a.mode, "shell")
+
+            a.send_progress(3)
+            while time.time() < deadline:
+                if ("alice", 3, None, False) in b.racers():
+                    break
+                time.sleep(0.01)
+            self.assertIn(("alice", 3, None, False), b.racers())
+
+            # Joining mid-race: the lobby knows a race is under way.
+            c = RaceClient("127.0.0.1", port, name="carol")
+            c.connect()
+            self.assertTrue(c.racing)
+            c.close()
+        finally:
+            a.close()
+            b.close()
+            asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+
+    def test_connect_to_unresponsive_host(self):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        client = RaceClient("127.0.0.1", 1, name="alice")
+        with mock.patch("race_client.asyncio.open_connection", hang):
+            with self.assertRaises(ConnectionError):
+                client.connect(timeout=0.2)
+        self.assertTrue(client.closed.wait(2))
+
+if __name__ == '__main__':
+    unittest.main()
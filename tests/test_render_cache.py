@@ -0,0 +1,54 @@
+import io
+import unittest
+from rich.console import Console
+from rich.panel import Panel
+from rich.text import Text
+from render_cache import PanelChrome, CachedRender
+
+
+class _AsciiFile(io.StringIO):
+    encoding = "ascii"
+
+
+def _render(renderable, width=50, file=None):
+    console = Console(file=file or io.StringIO(), width=width, force_terminal=True, color_system="truecolor")
+    console.print(renderable)
+    return console.file.getvalue()
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_framed_panel_matches_panel(self):
+        chrome = PanelChrome(title="Type the Line", border_style="magenta", padding=(1, 2))
+        body = Text("hello world", style="green")
+        expected = _render(Panel(body, title="Type the Line", border_style="magenta",
+                                 subtitle="WPM: 40", padding=(1, 2)))
+        self.assertEqual(_render(chrome.frame(body, subtitle="WPM: 40")), expected)
+
+    def test_chrome_rebuilt_on_resize(self):
+        chrome = PanelChrome(title="logs", border_style="green")
+        _render(chrome.frame(Text("a")), width=40)
+        top = chrome._top
+        _render(chrome.frame(Text("a")), width=40)
+        self.assertIs(chrome._top, top)
+        wide = _render(chrome.frame(Text("a")), width=60)
+        self.assertIsNot(chrome._top, top)
+        self.assertEqual(wide, _render(Panel(Text("a"), title="logs", border_style="green"), width=60))
+
+    def test_ascii_console_gets_ascii_edges(self):
+        chrome = PanelChrome(title="shell", border_style="yellow")
+        _render(chrome.frame(Text("ls")))
+        framed = _render(chrome.frame(Text("ls"), subtitle="WPM: 0"), file=_AsciiFile())
+        expected = _render(Panel(Text("ls"), title="shell", border_style="yellow", subtitle="WPM: 0"),
+                           file=_AsciiFile())
+        self.assertEqual(framed, expected)
+        self.assertTrue(framed.isascii())
+
+    def test_cached_render_replays_segments(self):
+        cached = CachedRender(Panel(Text("menu"), border_style="cyan"))
+        first = _render(cached)
+        lines = cached._lines
+        self.assertEqual(_render(cached), first)
+        self.assertIs(cached._lines, lines)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import io
+import unittest
+from rich.console import Console
+from rolling_wpm import RollingWPM, sparkline
+from ui_renderer import UIRenderer
+
+
+class TestRollingWPM(unittest.TestCase):
+    def test_window_forgets_old_keystrokes(self):
+        meter = RollingWPM(window=5.0)
+        meter.reset(0.0)
+        for i in range(50):              # 50 chars in the first 5s = 120 WPM
+            meter.add(i * 0.1)
+        self.assertAlmostEqual(meter.wpm(5.0), 120.0, delta=3.0)
+        # Nothing typed for a while: the rolling rate drops to zero.
+        self.assertEqual(meter.wpm(20.0), 0.0)
+
+    def test_short_session_uses_elapsed_time(self):
+        meter = RollingWPM(window=5.0)
+        meter.reset(0.0)
+        for i in range(10):
+            meter.add(i * 0.1)
+        # 10 chars in 1s = 120 WPM, not averaged over the full window.
+        self.assertAlmostEqual(meter.wpm(1.0), 120.0, delta=1.0)
+
+    def test_trace_memory_is_bounded(self):
+        meter = RollingWPM(sample_interval=1.0, max_samples=16)
+        meter.reset(0.0)
+        t = 0.0
+        while t < 3600:
+            meter.add(t)
+            meter.sample(t)
+            t += 0.2
+        self.assertLess(len(meter.samples), 16)
+        self.assertGreater(meter.sample_interval, 1.0)
+
+    def test_sparkline(self):
+        self.assertEqual(sparkline([]), "")
+        self.assertEqual(sparkline([0, 50, 100]), "▁▅█")
+        self.assertEqual(len(sparkline(list(range(100)), width=10)), 10)
+
+class TestPaceDisplay(unittest.TestCase):
+    def test_code_status_bar_stays_on_one_line(self):
+        console = Console(file=io.StringIO(), width=80, height=12, color_system=None)
+        screen = UIRenderer("code").render_screen(
+            "def f(x):\n    return x", "def f(x):\n    re", 42, 97, 120,
+            live_wpm=55, trend=sparkline(list(range(40))),
+        )
+        console.print(screen)
+        lines = console.file.getvalue().splitlines()
+        status = [line for line in lines if "NORMAL" in line]
+        self.assertEqual(len(status), 1)
+        self.assertIn("Ln 2, Col 7", status[0])
+        self.assertIn("Now:  55", status[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import stats
+from stats import StatsManager, lttb, moving_average
+
+
+class StatsTestCase(unittest.TestCase):
+    """Profiles live in a scratch directory, and the legacy history file is
+    pointed there too so a real typing_history.json is never imported."""
+
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.dir = scratch.name
+        patcher = mock.patch.object(stats, "STATS_FILE", os.path.join(self.dir, "legacy.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _manager(self, entries):
+        manager = StatsManager(profile="test", profiles_dir=os.path.join(self.dir, "graph"))
+        manager._history = entries
+        return manager
+
+
+def _entry(wpm, mode="code"):
+    return {"timestamp": "2026-01-01T10:00:00", "wpm": wpm, "accuracy": 95.0,
+            "chars": 100, "elapsed": 30.0, "mode": mode, "time_limit": 0}
+
+
+class TestHistoryGraph(StatsTestCase):
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        values = [50.0] * 1000
+        values[437] = 120.0
+        picked = lttb(values, 20)
+        self.assertEqual(len(picked), 20)
+        self.assertEqual((picked[0], picked[-1]), (0, 999))
+        self.assertIn(437, picked)
+        self.assertEqual(picked, sorted(picked))
+
+    def test_lttb_short_series_untouched(self):
+        self.assertEqual(lttb([1, 2, 3], 10), [0, 1, 2])
+
+    def test_moving_average(self):
+        self.assertEqual(moving_average([2, 4, 6, 8], 2), [2, 3, 5, 7])
+
+    def test_graph_series_filters_and_caches(self):
+        manager = self._manager([_entry(i, "code" if i % 2 else "line") for i in range(500)])
+        wpms, accs = manager.graph_series(30, mode="code")
+        self.assertEqual(len(wpms), 30)
+        self.assertTrue(all(w % 2 == 1 for w in wpms))
+        self.assertIs(manager.graph_series(30, mode="code")[0], wpms)
+
+class TestProfiles(StatsTestCase):
+    def test_histories_are_sharded_and_loaded_lazily(self):
+        alice = StatsManager(profile="alice", profiles_dir=self.dir)
+        alice.record(60, 98, 300, 60, "code", 0)
+        bob = StatsManager(profile="bob", profiles_dir=self.dir)
+        bob.record(40, 90, 200, 60, "line", 0)
+
+        fresh = StatsManager(profile="alice", profiles_dir=self.dir)
+        self.assertEqual(fresh.profiles(), ["alice", "bob"])
+        self.assertIsNone(fresh._history)
+        self.assertEqual([e["wpm"] for e in fresh.history], [60])
+        fresh.switch_profile("bob")
+        self.assertEqual([e["wpm"] for e in fresh.history], [40])
+
+    def test_leaderboard_uses_summaries_only(self):
+        for name, wpm in (("alice", 60), ("bob", 80), ("carol", 70)):
+            StatsManager(profile=name, profiles_dir=self.dir).record(wpm, 95, 100, 30, "code", 0)
+        manager = StatsManager(profile="alice", profiles_dir=self.dir)
+        with mock.patch.object(stats, "_read_json", side_effect=AssertionError("history read")):
+            board = manager.leaderboard(n=2)
+        self.assertEqual([name for name, _ in board], ["bob", "carol"])
+
+    def test_legacy_history_is_imported(self):
+        stats._write_json(stats.STATS_FILE, [
+            {"timestamp": "2026-01-01T10:00:00", "wpm": 55.0, "accuracy": 97.0,
+             "chars": 100, "elapsed": 30.0, "mode": "code", "time_limit": 0},
+        ])
+        manager = StatsManager(profile="me", profiles_dir=os.path.join(self.dir, "profiles"))
+        self.assertEqual(manager.summary()["tests"], 1)
+        self.assertEqual(len(manager.history), 1)
+
+class TestPersonalBests(StatsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manager = StatsManager(profile="me", profiles_dir=self.dir)
+
+    def test_best_per_mode_and_time_limit(self):
+        self.assertIsNone(self.manager.personal_best("code", 30))
+        for wpm, mode, limit in ((50, "code", 30), (70, "code", 30), (90, "code", 0), (60, "line", 30)):
+            self.manager.record(wpm, 95, 100, 30, mode, limit)
+        self.assertEqual(self.manager.personal_best("code", 30)["wpm"], 70)
+        self.assertEqual(self.manager.personal_best("code", 0)["wpm"], 90)
+        self.assertEqual(self.manager.personal_best("line", 30)["wpm"], 60)
+
+    def test_top_tests_are_capped_and_merged(self):
+        for wpm in range(30):
+            self.manager.record(wpm, 95, 100, 30, "code" if wpm % 2 else "line", 15)
+        top = self.manager.top_tests()
+        self.assertEqual([e["wpm"] for e in top], list(range(29, 19, -1)))
+        self.assertTrue(all(e["mode"] == "line" for e in self.manager.top_tests("line")))
+        reloaded = StatsManager(profile="me", profiles_dir=self.dir)
+        self.assertEqual(len(reloaded.index["me"]["bests"]["code/15"]), stats.TOP_K)
+        self.assertIsNone(reloaded._history)
+
+    def test_bests_rebuilt_for_older_index(self):
+        self.manager.record(40, 95, 100, 30, "code", 0)
+        del self.manager.index["me"]["bests"]
+        stats._write_json(os.path.join(self.dir, stats.INDEX_FILE), self.manager.index)
+        self.manager.record(45, 95, 100, 30, "code", 0)
+        self.assertEqual([e["wpm"] for e in self.manager.top_tests("code")], [45, 40])
+
+    def test_error_totals_kept_in_summary(self):
+        self.manager.record(40, 90, 100, 30, "code", 0, errors={"sub": 2, "ins": 1, "omit": 0})
+        self.manager.record(50, 95, 100, 30, "code", 0)
+        self.manager.record(45, 92, 100, 30, "line", 0, errors={"sub": 1, "ins": 0, "omit": 3})
+        expected = {"tests": 2, "sub": 3, "ins": 1, "omit": 3}
+        reloaded = StatsManager(profile="me", profiles_dir=self.dir)
+        self.assertEqual(reloaded.summary()["errors"], expected)
+
+        # Older indexes without the totals count them from the history once.
+        del reloaded.index["me"]["summary"]["errors"]
+        stats._write_json(os.path.join(self.dir, stats.INDEX_FILE), reloaded.index)
+        reloaded.record(60, 90, 100, 30, "code", 0, errors={"sub": 1, "ins": 1, "omit": 1})
+        self.assertEqual(reloaded.summary()["errors"], {"tests": 3, "sub": 4, "ins": 2, "omit": 4})
+        reloaded.render_dashboard()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import random
+import unittest
+from rich.console import Console
+from rich.text import Text
+from text_layout import TextLayout, LaidOutText
+from ui_renderer import UIRenderer
+
+
+def plain_lines(renderable, width):
+    console = Console(file=io.StringIO(), width=width, color_system=None)
+    console.print(renderable)
+    return [line.rstrip() for line in console.file.getvalue().splitlines()]
+
+
+class TestTextLayout(unittest.TestCase):
+    def test_clusters_and_widths(self):
+        layout = TextLayout("é中👍🏽a")
+        self.assertEqual(layout.cluster_count, 4)
+        self.assertEqual(list(layout.cells), [1, 2, 2, 1])
+        # Both code points of the accented e belong to the first cluster.
+        self.assertEqual(layout.cluster_of[1], 0)
+        self.assertEqual(layout.locate(6), (0, 6))
+
+    def test_tabs_and_lines(self):
+        layout = TextLayout("ab\tc\n\tx", tab_size=4)
+        self.assertEqual(layout.locate(3), (0, 4))       # "c" sits on the tab stop
+        self.assertEqual(layout.locate(6), (1, 4))
+        self.assertEqual(layout.locate(7), (1, 5))       # end of text
+        self.assertEqual(layout.line_count, 2)
+        self.assertEqual(layout.max_line_cells, 5)
+
+    def test_wraps_like_rich_text(self):
+        text = "def f(x):\n    return x  # a comment that is long enough to wrap around"
+        layout = TextLayout(text)
+        whole = [(0, layout.cluster_count, "")]
+        for width in (12, 20, 33, 80):
+            self.assertEqual(plain_lines(LaidOutText(layout, whole), width), plain_lines(Text(text), width))
+        self.assertIs(layout.wrapped(20), layout.wrapped(20))
+
+    def test_extra_text_is_wrapped_like_inserted_characters(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            target = " ".join("".join(rng.choice("abcdefg") for _ in range(rng.randint(1, 8)))
+                              for _ in range(rng.randint(5, 60)))
+            layout = TextLayout(target)
+            inside = [i for i in range(1, len(target)) if target[i] != " " and target[i - 1] != " "]
+            runs, shown, done = [], target, 0
+            for cluster in sorted(rng.sample(inside, min(3, len(inside)))):
+                runs += [(done, cluster, ""), (cluster, cluster, "", "xy")]
+                done = cluster
+            runs.append((done, layout.cluster_count, ""))
+            for run in reversed(runs):
+                if len(run) == 4:
+                    shown = shown[:run[0]] + run[3] + shown[run[0]:]
+            for width in (15, 23, 40):
+                self.assertEqual(plain_lines(LaidOutText(layout, runs), width), plain_lines(Text(shown), width))
+
+    def test_wide_characters_wrap_by_cells(self):
+        layout = TextLayout("中文字符测试")
+        lines = plain_lines(LaidOutText(layout, [(0, layout.cluster_count, "")]), 6)
+        self.assertEqual(lines, ["中文字", "符测试"])
+
+
+class TestLayoutRendering(unittest.TestCase):
+    def test_code_mode_shows_real_line_and_column(self):
+        renderer = UIRenderer("code")
+        target = "def f(x):\n\treturn x"
+        screen = plain_lines(renderer.render_screen(target, "def f(x):\n\tre", 40, 100), 80)
+        self.assertTrue(any("Ln 2, Col 11" in line for line in screen))
+
+    def test_cursor_covers_whole_cluster(self):
+        renderer = UIRenderer("paragraph")
+        target = "éx"
+        layout = TextLayout(target)
+        renderer.render_screen(target, "e", 40, 100, layout=layout)
+        content = renderer._build_typed_content(target, "e")
+        self.assertIs(content.layout, layout)
+        self.assertIn((0, 1, "reverse blink"), content.runs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,311 @@
+import re
+from array import array
+from bisect import bisect_right
+from rich.cells import cell_len
+from rich.measure import Measurement
+from rich.segment import Segment
+
+try:
+    from rich.cells import split_graphemes
+except ImportError:  # older rich: no grapheme splitting
+    split_graphemes = None
+
+# Tabs and newlines are laid out here, not measured; keep them out of clusters.
+_CONTROL = re.compile(r"[\t\n]")
+
+# Wrapped layouts kept per TextLayout (one per terminal width in practice).
+MAX_WRAPS = 4
+
+
+class TextLayout:
+    """Grapheme clusters, cell widths and line/column positions of a target text.
+
+    Built once when a text is picked; after that, everything a frame needs is
+    an array lookup. A cluster is what the terminal draws as one character
+    (a letter plus its combining marks, an emoji with its modifiers, ...).
+    Tabs are expanded to tab stops and newlines end a line, so `cells` is
+    what each cluster really takes on screen.
+
+    Tables, indexed by cluster unless noted:
+      starts     -- code point index where the cluster begins (plus a sentinel)
+      cells      -- display width in cells
+      lines/cols -- 0-based line and cell column (plus a sentinel for the end)
+      cluster_of -- code point index -> cluster (len(text) maps to the end)
+    """
+
+    def __init__(self, text, tab_size=8):
+        self.text = text
+        self.tab_size = tab_size
+        self.starts = array("I")
+        self.cells = array("B")
+        self.lines = array("I")
+        self.cols = array("I")
+        self.cluster_of = array("I", [0]) * (len(text) + 1)
+        self.display = []        # what each cluster draws as
+        self._wraps = {}         # (width, offset) -> _Wrapped
+        self._extra_wraps = {}   # (width, offset, extra) -> _Wrapped
+
+        line = col = widest = 0
+        for start, end, width in split_clusters(text):
+            ch = text[start:end]
+            if ch == "\n":
+                width = 0
+                shown = ""
+            elif ch == "\t":
+                width = tab_size - col % tab_size
+                shown = " " * width
+            else:
+                shown = ch
+            index = len(self.starts)
+            self.starts.append(start)
+            self.cells.append(width)
+            self.lines.append(line)
+            self.cols.append(col)
+            self.display.append(shown)
+            for i in range(start, end):
+                self.cluster_of[i] = index
+            if ch == "\n":
+                widest = max(widest, col)
+                line += 1
+                col = 0
+            else:
+                col += width
+
+        self.cluster_count = len(self.starts)
+        self.cluster_of[len(text)] = self.cluster_count
+        self.starts.append(len(text))
+        self.lines.append(line)
+        self.cols.append(col)
+        self.line_count = line + 1
+        self.max_line_cells = max(widest, col)
+
+    def locate(self, pos):
+        """(line, column) of code point `pos`, both 0-based; a column counts cells."""
+        cluster = self.cluster_of[pos]
+        return self.lines[cluster], self.cols[cluster]
+
+    def is_newline(self, cluster):
+        return self.text[self.starts[cluster]] == "\n"
+
+    def is_space(self, cluster):
+        return self.text[self.starts[cluster]] in " \t"
+
+    def wrapped(self, width, offset=0, extra=None):
+        """Word-wrap the text to `width` cells, the first row starting at `offset`.
+
+        `extra` maps a cluster to the cells of text drawn just before it that
+        isn't part of the target (forgiving mode's extra keystrokes). Only
+        the rows from the first such cluster on are wrapped again.
+        """
+        width = max(1, width)
+        base = self._wraps.get((width, offset))
+        if base is None:
+            if len(self._wraps) >= MAX_WRAPS:
+                self._wraps.clear()
+            base = self._wraps[(width, offset)] = _Wrapped(self, _wrap_rows(self, width, offset))
+        if not extra:
+            return base
+        key = (width, offset, tuple(sorted(extra.items())))
+        wrap = self._extra_wraps.get(key)
+        if wrap is None:
+            if len(self._extra_wraps) >= MAX_WRAPS:
+                self._extra_wraps.clear()
+            rows = _wrap_rows(self, width, offset, extra, base)
+            wrap = self._extra_wraps[key] = _Wrapped(self, rows, base)
+        return wrap
+
+
+class _Wrapped:
+    """Rows of a TextLayout at one width: which clusters each row holds, the
+    row's text, and where each cluster starts within it. Rows that are the
+    same as in `base` share its text."""
+
+    def __init__(self, layout, rows, base=None):
+        self.rows = rows
+        self.starts = array("I", [start for start, _ in rows])
+        self.index = {start: row for row, (start, _) in enumerate(rows)}
+        self.text = []
+        if base is None:
+            self.offsets = array("I", [0]) * layout.cluster_count
+        else:
+            self.offsets = array("I", base.offsets)
+        display = layout.display
+        for start, end in rows:
+            row = base.index.get(start) if base is not None else None
+            if row is not None and base.rows[row][1] == end:
+                self.text.append(base.text[row])
+                continue
+            at = 0
+            for cluster in range(start, end):
+                self.offsets[cluster] = at
+                at += len(display[cluster])
+            self.text.append("".join(display[start:end]))
+
+    def slice(self, row, start, end):
+        """Text of clusters [start, end) on `row`."""
+        row_start, row_end = self.rows[row]
+        text = self.text[row]
+        stop = len(text) if end >= row_end else self.offsets[end]
+        return text[self.offsets[start]:stop]
+
+
+class LaidOutText:
+    """Renders a TextLayout in styled runs, wrapping with the precomputed tables.
+
+    `runs` is a list of (first_cluster, end_cluster, style) covering the text
+    in order. A run (cluster, cluster, style, text) draws extra `text` that
+    isn't part of the target just before `cluster`. `cursor` is a cluster
+    index drawn even when it has no width of its own (a newline). Stands in
+    for a rich Text that would re-measure every character on every frame.
+    """
+
+    def __init__(self, layout, runs, prefix=None, cursor=None, cursor_style="reverse blink"):
+        self.layout = layout
+        self.runs = runs
+        self.prefix = prefix        # (text, style) drawn before the first row
+        self.cursor = cursor
+        self.cursor_style = cursor_style
+
+    def _prefix_cells(self):
+        return cell_len(self.prefix[0]) if self.prefix else 0
+
+    def __rich_measure__(self, console, options):
+        width = min(options.max_width, self.layout.max_line_cells + self._prefix_cells())
+        return Measurement(width, width)
+
+    def __rich_console__(self, console, options):
+        layout = self.layout
+        runs = self.runs
+        extra = {}
+        for run in runs:
+            if run[0] == run[1]:
+                extra[run[0]] = extra.get(run[0], 0) + cell_len(run[3])
+        wrap = layout.wrapped(options.max_width, self._prefix_cells(), extra)
+        styles = [console.get_style(run[2]) for run in runs]
+        last_row = len(wrap.rows) - 1
+        newline_cursor = self.cursor is not None and self.cursor < layout.cluster_count \
+            and layout.is_newline(self.cursor)
+        run = 0
+        for row, (start, end) in enumerate(wrap.rows):
+            if row == 0 and self.prefix:
+                yield Segment(self.prefix[0], console.get_style(self.prefix[1]))
+            while run < len(runs) and runs[run][1] <= start and runs[run][0] < start:
+                run += 1
+            index = run
+            # Extra text at the very end of the target goes on the last row.
+            while index < len(runs) and (runs[index][0] < end or (row == last_row and runs[index][0] == end)):
+                first, last = runs[index][0], runs[index][1]
+                if first == last:
+                    text = runs[index][3]
+                else:
+                    text = wrap.slice(row, max(first, start), min(last, end))
+                if text:
+                    yield Segment(text, styles[index])
+                index += 1
+            if newline_cursor and start <= self.cursor < end:
+                yield Segment(" ", console.get_style(self.cursor_style))
+            yield Segment.line()
+
+
+def split_clusters(text):
+    """(start, end, cells) for each grapheme cluster; tabs and newlines stand
+    alone with no width of their own."""
+    pos = 0
+    for match in _CONTROL.finditer(text):
+        yield from _graphemes(text[pos:match.start()], pos)
+        yield match.start(), match.end(), 0
+        pos = match.end()
+    yield from _graphemes(text[pos:], pos)
+
+
+def _graphemes(chunk, base):
+    if not chunk:
+        return
+    if split_graphemes is not None:
+        spans, _ = split_graphemes(chunk)
+        for start, end, cells in spans:
+            yield base + start, base + end, cells
+        return
+    # Without rich's splitter, zero-width characters join the one before.
+    start = 0
+    for i in range(1, len(chunk) + 1):
+        if i == len(chunk) or cell_len(chunk[i]) > 0:
+            yield base + start, base + i, cell_len(chunk[start:i])
+            start = i
+
+
+def _wrap_rows(layout, width, offset, extra=None, base=None):
+    """Greedy word wrap over clusters: (first_cluster, end_cluster) per row.
+
+    Breaks after spaces, at newlines, and inside words too wide for a row.
+    With `extra` (see TextLayout.wrapped), rows before the first extra
+    cluster are taken from `base`, the plain wrap; so are the rows after the
+    last one, as soon as a row starts where one of base's does.
+    """
+    cells = layout.cells
+    count = layout.cluster_count
+    extra = extra or {}
+    rows = []
+    start = 0
+    last_extra = -1
+    if extra:
+        last_extra = max(extra)
+        first_row = bisect_right(base.starts, min(extra)) - 1
+        rows = base.rows[:first_row]
+        start = base.rows[first_row][0]
+    used = 0 if rows else offset
+    has_word = used > 0    # the row holds more than indentation
+    k = start
+
+    def rejoin(cluster):
+        # Past the last extra text, a row starting where one of base's does
+        # wraps the same from there on.
+        row = base.index.get(cluster) if cluster > last_extra >= 0 else None
+        return None if row is None else rows + base.rows[row:]
+
+    while k < count:
+        if layout.is_newline(k):
+            used += extra.get(k, 0)
+            rows.append((start, k + 1))
+            start = k = k + 1
+            used = 0
+            has_word = False
+            joined = rejoin(k)
+            if joined is not None:
+                return joined
+            continue
+        if layout.is_space(k) and k not in extra:
+            # Like rich, spaces stay at the end of their row (cropped if they
+            # overhang) rather than starting the next one.
+            used += cells[k]
+            k += 1
+            continue
+        end = k
+        word = 0
+        while end < count and not layout.is_newline(end) and not (layout.is_space(end) and end not in extra):
+            word += cells[end] + extra.get(end, 0)
+            end += 1
+        if used + word > width and has_word:
+            rows.append((start, k))
+            start = k
+            used = 0
+            joined = rejoin(k)
+            if joined is not None:
+                return joined
+        for cluster in range(k, end):
+            cluster_cells = cells[cluster] + extra.get(cluster, 0)
+            if used + cluster_cells > width and cluster > start:
+                rows.append((start, cluster))
+                start = cluster
+                used = 0
+                joined = rejoin(cluster)
+                if joined is not None:
+                    return joined
+            used += cluster_cells
+        has_word = True
+        k = end
+    if count in extra and used + extra[count] > width and count > start:
+        rows.append((start, count))
+        start = count
+    rows.append((start, count))
+    return rows
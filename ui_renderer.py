@@ -5,114 +5,235 @@ from rich.console import Group
 from rich.align import Align
 from rich.table import Table
 from rich.columns import Columns
+from rich.cells import cell_len
+from render_cache import PanelChrome, CachedRender
+from aligner import MATCH, SUBSTITUTION, OMISSION
+from text_layout import TextLayout, LaidOutText
+
+# Static chrome for each typing panel. Built once per renderer and reused
+# every frame; see PanelChrome.
+MODE_CHROME = {
+    "code": dict(title="vim: /src/backend/engine.py", border_style="blue", padding=(1, 2)),
+    "logs": dict(title="tail -f /var/log/syslog", border_style="green"),
+    "shell": dict(title="user@server:~$", border_style="yellow"),
+    "paragraph": dict(title="Type the Paragraph", border_style="cyan", padding=(1, 2)),
+    "line": dict(title="Type the Line", border_style="magenta", padding=(1, 2)),
+    "race": dict(title="Race", border_style="bright_white"),
+}
+
+# Rows shown in the race track; the rest of the field is summarised.
+RACE_TRACK_ROWS = 8
+
+BLANK_LINE = Text("")
+
+RESULTS_HEADER = Text()
+RESULTS_HEADER.append("\n")
+RESULTS_HEADER.append("  ╔══════════════════════════════════════╗\n", style="bold yellow")
+RESULTS_HEADER.append("  ║         RACE COMPLETE!               ║\n", style="bold yellow")
+RESULTS_HEADER.append("  ╚══════════════════════════════════════╝\n", style="bold yellow")
+RESULTS_HEADER.append("\n")
+
+class FitStatus:
+    """A right-aligned one-line status bar: the first of `texts` that fits
+    the width, or the last one cropped if none do."""
+
+    def __init__(self, *texts, style=""):
+        self.texts = texts
+        self.style = style
+
+    def __rich_console__(self, console, options):
+        for text in self.texts:
+            if cell_len(text) <= options.max_width:
+                break
+        yield Align.right(Text(text, style=self.style, no_wrap=True, overflow="crop"))
 
 class UIRenderer:
     def __init__(self, mode):
         self.mode = mode
+        self._chrome = {}
+        self._layout = None
 
-    def render_screen(self, target_text, user_input, wpm, accuracy, time_remaining=0):
+    def _chrome_for(self, layout):
+        chrome = self._chrome.get(layout)
+        if chrome is None:
+            chrome = self._chrome[layout] = PanelChrome(**MODE_CHROME[layout])
+        return chrome
+
+    def _layout_for(self, target_text, layout=None):
+        """The TextLayout for target_text: the one passed in, or one built once and kept."""
+        if layout is not None and layout.text is target_text:
+            self._layout = layout
+        elif self._layout is None or self._layout.text is not target_text:
+            self._layout = TextLayout(target_text)
+        return self._layout
+
+    def render_screen(self, target_text, user_input, wpm, accuracy, time_remaining=0, racers=None,
+                      live_wpm=None, trend="", alignment=None, layout=None):
+        self._layout_for(target_text, layout)
         if self.mode == "code":
-            return self.render_code_mode(target_text, user_input, wpm, accuracy, time_remaining)
+            panel = self.render_code_mode(target_text, user_input, wpm, accuracy, time_remaining, live_wpm, trend, alignment)
         elif self.mode == "logs":
-            return self.render_logs_mode(target_text, user_input, wpm, accuracy, time_remaining)
+            panel = self.render_logs_mode(target_text, user_input, wpm, accuracy, time_remaining, live_wpm, trend, alignment)
         elif self.mode == "paragraph":
-            return self.render_paragraph_mode(target_text, user_input, wpm, accuracy, time_remaining)
+            panel = self.render_paragraph_mode(target_text, user_input, wpm, accuracy, time_remaining, live_wpm, trend, alignment)
         elif self.mode == "line":
-            return self.render_line_mode(target_text, user_input, wpm, accuracy, time_remaining)
+            panel = self.render_line_mode(target_text, user_input, wpm, accuracy, time_remaining, live_wpm, trend, alignment)
         else:
-            return self.render_shell_mode(target_text, user_input, wpm, accuracy, time_remaining)
+            panel = self.render_shell_mode(target_text, user_input, wpm, accuracy, time_remaining, live_wpm, trend, alignment)
 
-    def _build_typed_content(self, target_text, user_input, correct_style="green", error_style="white on red", remaining_style="dim white"):
-        content = Text()
-        min_len = min(len(target_text), len(user_input))
+        if racers:
+            return self.with_race_track(panel, racers, len(target_text))
+        return panel
 
-        for i in range(min_len):
-            if user_input[i] == target_text[i]:
-                content.append(target_text[i], style=correct_style)
-            else:
-                content.append(target_text[i], style=error_style)
+    def with_race_track(self, panel, racers, text_len):
+        """Stack the race track under a full-screen panel."""
+        layout = Layout()
+        layout.split_column(
+            Layout(panel),
+            Layout(self.render_race_track(racers, text_len), size=min(len(racers), RACE_TRACK_ROWS) + 2),
+        )
+        return layout
+
+    def _build_typed_content(self, target_text, user_input, correct_style="green", error_style="white on red", remaining_style="dim white", alignment=None, prefix=None):
+        # Styles go on whole grapheme clusters: a cluster is wrong if any of
+        # its code points is, and the cursor covers the cluster it's in.
+        layout = self._layout_for(target_text)
+        if alignment is not None:
+            cursor = layout.cluster_of[min(alignment.position, len(target_text))]
+            marks = self._alignment_marks(layout, alignment, error_style)
+        else:
+            cluster_of = layout.cluster_of
+            cursor = cluster_of[min(len(user_input), len(target_text))]
+            errors = sorted({cluster_of[i] for i, (a, b) in enumerate(zip(user_input, target_text)) if a != b})
+            marks = [(cluster, error_style, None) for cluster in errors]
+
+        runs = []
+        done = 0
+        for cluster, style, inserted in marks:
+            if cluster > cursor or (cluster == cursor and inserted is None):
+                break
+            if cluster > done:
+                runs.append((done, cluster, correct_style))
+                done = cluster
+            if inserted is not None:
+                runs.append((cluster, cluster, style, inserted))
+            elif cluster == done:
+                runs.append((cluster, cluster + 1, style))
+                done = cluster + 1
+        if cursor > done:
+            runs.append((done, cursor, correct_style))
+        if cursor < layout.cluster_count:
+            runs.append((cursor, cursor + 1, "reverse blink"))
+            runs.append((cursor + 1, layout.cluster_count, remaining_style))
 
-        if len(user_input) < len(target_text):
-            content.append(target_text[min_len], style="reverse blink")
-            content.append(target_text[min_len+1:], style=remaining_style)
+        return LaidOutText(layout, runs, prefix=prefix, cursor=cursor)
 
-        return content
+    def _alignment_marks(self, layout, alignment, error_style):
+        """(cluster, style, inserted_text) for each error in an edit-distance
+        alignment, in text order.
+
+        Skipped target characters are underlined and extra typed characters
+        are shown struck through where they were typed, before `cluster`.
+        """
+        cluster_of = layout.cluster_of
+        marks = []
+        inserted = 0
+        # Only the errors are looked at; matches are the gaps between them.
+        errors = [(k, op) for k, op in enumerate(alignment.ops()) if op[0] != MATCH]
+        for k, (op, j, typed) in errors:
+            if op == SUBSTITUTION:
+                marks.append((cluster_of[j], error_style, None))
+            elif op == OMISSION:
+                marks.append((cluster_of[j], f"{error_style} underline", None))
+            else:
+                # Every op before this one that isn't an insertion used up
+                # one target character.
+                cluster = cluster_of[k - inserted]
+                inserted += 1
+                shown = typed if typed.isprintable() and not typed.isspace() else "·"
+                if marks and marks[-1][0] == cluster and marks[-1][2] is not None:
+                    marks[-1] = (cluster, marks[-1][1], marks[-1][2] + shown)
+                else:
+                    marks.append((cluster, f"{error_style} strike", shown))
+        return marks
+
+    def _cursor_index(self, target_text, user_input, alignment):
+        position = alignment.position if alignment is not None else len(user_input)
+        return min(position, len(target_text))
 
     def _timer_text(self, time_remaining):
         if time_remaining > 0:
             return f" | Time: {time_remaining:.0f}s"
         return ""
 
-    def render_code_mode(self, target_text, user_input, wpm, accuracy, time_remaining):
-        content = self._build_typed_content(target_text, user_input)
-        timer = self._timer_text(time_remaining)
-        status = f" NORMAL  | main.py | python | WPM: {wpm:3.0f} | ACC: {accuracy:3.0f}%{timer} | Ln {len(user_input)//50 + 1}, Col {len(user_input)%50}"
+    def _pace_text(self, live_wpm, trend):
+        if live_wpm is None:
+            return ""
+        return f" | Now: {live_wpm:3.0f} {trend}".rstrip()
 
-        return Panel(
-            Group(
-                content,
-                Align.right(Text(status, style="bold black on blue"))
-            ),
-            title="vim: /src/backend/engine.py",
-            border_style="blue",
-            padding=(1, 2)
+    def render_code_mode(self, target_text, user_input, wpm, accuracy, time_remaining, live_wpm=None, trend="", alignment=None):
+        content = self._build_typed_content(target_text, user_input, alignment=alignment)
+        timer = self._timer_text(time_remaining)
+        line, col = self._layout_for(target_text).locate(self._cursor_index(target_text, user_input, alignment))
+        stats = f"WPM: {wpm:3.0f} | ACC: {accuracy:3.0f}%{timer}"
+        position = f" | Ln {line + 1}, Col {col + 1}"
+        # The vim bar is a single line: drop the sparkline, then the file
+        # info and so on when the full version doesn't fit; Ln/Col goes last.
+        status = FitStatus(
+            f" NORMAL  | main.py | python | {stats}{self._pace_text(live_wpm, trend)}{position}",
+            f" NORMAL  | main.py | python | {stats}{self._pace_text(live_wpm, '')}{position}",
+            f" NORMAL  | {stats}{self._pace_text(live_wpm, '')}{position}",
+            f" NORMAL  | {stats}{position}",
+            f" WPM: {wpm:3.0f} | ACC: {accuracy:3.0f}%{position}",
+            position[2:],
+            style="bold black on blue",
         )
 
-    def render_logs_mode(self, target_text, user_input, wpm, accuracy, time_remaining):
-        content = self._build_typed_content(target_text, user_input, correct_style="grey70", error_style="red", remaining_style="dim grey30")
-        timer = self._timer_text(time_remaining)
+        return self._chrome_for("code").frame(Group(content, status))
+
+    def render_logs_mode(self, target_text, user_input, wpm, accuracy, time_remaining, live_wpm=None, trend="", alignment=None):
+        content = self._build_typed_content(target_text, user_input, correct_style="grey70", error_style="red", remaining_style="dim grey30", alignment=alignment)
+        timer = self._timer_text(time_remaining) + self._pace_text(live_wpm, trend)
 
-        return Panel(
+        return self._chrome_for("logs").frame(
             content,
-            title="tail -f /var/log/syslog",
-            border_style="green",
             subtitle=f"WPM: {wpm:.0f} | ACC: {accuracy:.0f}%{timer}"
         )
 
-    def render_shell_mode(self, target_text, user_input, wpm, accuracy, time_remaining):
-        content = Text()
-        content.append("$ ", style="bold green")
+    def render_shell_mode(self, target_text, user_input, wpm, accuracy, time_remaining, live_wpm=None, trend="", alignment=None):
+        content = self._build_typed_content(target_text, user_input, correct_style="white", alignment=alignment,
+                                            prefix=("$ ", "bold green"))
+        timer = self._timer_text(time_remaining) + self._pace_text(live_wpm, trend)
 
-        typed = self._build_typed_content(target_text, user_input, correct_style="white")
-        content.append_text(typed)
-        timer = self._timer_text(time_remaining)
-
-        return Panel(
+        return self._chrome_for("shell").frame(
             content,
-            title="user@server:~$",
-            border_style="yellow",
             subtitle=f"WPM: {wpm:.0f} | ACC: {accuracy:.0f}%{timer}"
         )
 
-    def render_paragraph_mode(self, target_text, user_input, wpm, accuracy, time_remaining):
-        content = self._build_typed_content(target_text, user_input)
-        timer = self._timer_text(time_remaining)
+    def render_paragraph_mode(self, target_text, user_input, wpm, accuracy, time_remaining, live_wpm=None, trend="", alignment=None):
+        content = self._build_typed_content(target_text, user_input, alignment=alignment)
+        timer = self._timer_text(time_remaining) + self._pace_text(live_wpm, trend)
         status = f"WPM: {wpm:.0f} | ACC: {accuracy:.0f}%{timer} | {len(user_input)}/{len(target_text)} chars"
 
-        return Panel(
+        return self._chrome_for("paragraph").frame(
             Group(
                 content,
-                Text(""),
+                BLANK_LINE,
                 Align.center(Text(status, style="bold cyan"))
-            ),
-            title="Type the Paragraph",
-            border_style="cyan",
-            padding=(1, 2)
+            )
         )
 
-    def render_line_mode(self, target_text, user_input, wpm, accuracy, time_remaining):
-        content = self._build_typed_content(target_text, user_input)
-        timer = self._timer_text(time_remaining)
+    def render_line_mode(self, target_text, user_input, wpm, accuracy, time_remaining, live_wpm=None, trend="", alignment=None):
+        content = self._build_typed_content(target_text, user_input, alignment=alignment)
+        timer = self._timer_text(time_remaining) + self._pace_text(live_wpm, trend)
 
-        return Panel(
+        return self._chrome_for("line").frame(
             Align.center(content),
-            title="Type the Line",
-            border_style="magenta",
-            subtitle=f"WPM: {wpm:.0f} | ACC: {accuracy:.0f}%{timer}",
-            padding=(1, 2)
+            subtitle=f"WPM: {wpm:.0f} | ACC: {accuracy:.0f}%{timer}"
         )
 
-    def render_results(self, wpm, accuracy, chars_typed, elapsed, time_limit):
+    def render_results(self, wpm, accuracy, chars_typed, elapsed, time_limit, trend="", errors=None,
+                       new_best=None):
         rank, rank_style, bar_fill = self._get_rank(wpm, accuracy)
 
         bar_len = 40
@@ -120,12 +241,12 @@ class UIRenderer:
         bar = "█" * filled + "░" * (bar_len - filled)
 
         # Build the results display
-        content = Text()
-        content.append("\n")
-        content.append("  ╔══════════════════════════════════════╗\n", style="bold yellow")
-        content.append("  ║         RACE COMPLETE!               ║\n", style="bold yellow")
-        content.append("  ╚══════════════════════════════════════╝\n", style="bold yellow")
-        content.append("\n")
+        content = RESULTS_HEADER.copy()
+
+        if new_best is not None:
+            mode_label = f"{time_limit}s" if time_limit > 0 else "completion"
+            content.append("  ★ NEW PERSONAL BEST! ★", style="bold bright_magenta blink")
+            content.append(f"  {self.mode}, {mode_label}, was {new_best:.0f} WPM\n\n", style="bright_magenta")
 
         # Rank display
         content.append("  Your Rank:  ", style="white")
@@ -147,6 +268,17 @@ class UIRenderer:
         content.append("              ", style="dim")
         content.append(f"{acc_bar}\n\n", style=acc_style)
 
+        if errors is not None:
+            content.append("  Errors      ", style="dim")
+            content.append(
+                f"{errors['sub']} wrong · {errors['ins']} extra · {errors['omit']} skipped\n\n",
+                style="bold white",
+            )
+
+        if trend:
+            content.append("  Pace        ", style="dim")
+            content.append(f"{trend}\n\n", style=rank_style)
+
         content.append("  Characters  ", style="dim")
         content.append(f"{chars_typed}\n", style="bold white")
 
@@ -160,12 +292,67 @@ class UIRenderer:
         content.append("  Press any key to exit", style="dim italic")
         content.append("\n")
 
-        return Panel(
+        # The results stay on screen for a while; render them once, not per refresh.
+        return CachedRender(Panel(
             content,
             title="RESULTS",
             border_style=rank_style,
             padding=(1, 2)
-        )
+        ))
+
+    def render_race_track(self, racers, text_len):
+        """Progress of everyone in a race; racers are (name, pos, place, is_me) tuples."""
+        ranked = sorted(racers, key=lambda r: (r[2] is None, r[2] or 0, -r[1]))
+        my_rank = next((i for i, r in enumerate(ranked) if r[3]), None)
+        shown = ranked[:RACE_TRACK_ROWS]
+        if my_rank is not None and my_rank >= RACE_TRACK_ROWS:
+            shown[-1] = ranked[my_rank]
+
+        bar_len = 30
+        content = Text()
+        for i, (name, pos, place, is_me) in enumerate(shown):
+            if i:
+                content.append("\n")
+            filled = min(bar_len, int(pos / text_len * bar_len)) if text_len else 0
+            name_style = "bold yellow" if is_me else "white"
+            content.append(f"{name[:12]:<12} ", style=name_style)
+            content.append("█" * filled, style="bright_magenta" if place else "green")
+            content.append("░" * (bar_len - filled), style="dim")
+            if place:
+                content.append(f"  #{place}", style="bold bright_magenta")
+            else:
+                pct = pos * 100 // text_len if text_len else 0
+                content.append(f" {pct:3d}%", style="dim")
+
+        subtitle = f"{len(racers)} racers"
+        if my_rank is not None:
+            subtitle += f" | you: {my_rank + 1}/{len(racers)}"
+        return self._chrome_for("race").frame(content, subtitle=subtitle)
+
+    def render_lobby(self, racers, countdown=None, racing=False, standings=None):
+        content = Text()
+        if standings:
+            content.append("  Last race\n", style="bold yellow")
+            for place, (_, name, wpm, acc) in enumerate(standings[:RACE_TRACK_ROWS], 1):
+                content.append(f"  {place:>3}. {name[:12]:<12} ", style="white")
+                content.append(f"{wpm:4.0f} WPM  {acc:5.1f}%\n", style="dim")
+            content.append("\n")
+
+        if countdown is not None:
+            content.append(f"  Race starts in {countdown:.0f}s\n\n", style="bold green")
+        elif racing:
+            content.append("  Race in progress, you're in the next one\n\n", style="bold cyan")
+        else:
+            content.append("  Waiting for players...\n\n", style="bold cyan")
+
+        names = [f"{name}{' (you)' if is_me else ''}" for name, _, _, is_me in racers]
+        content.append(f"  {len(names)} in the lobby: ", style="dim")
+        content.append(", ".join(names[:20]), style="white")
+        if len(names) > 20:
+            content.append(f" and {len(names) - 20} more", style="dim")
+        content.append("\n\n  Press ESC to leave", style="dim italic")
+
+        return Panel(content, title="RACE LOBBY", border_style="bright_cyan", padding=(1, 2))
 
     def _get_rank(self, wpm, accuracy):
         score = wpm * (accuracy / 100)